@@ -0,0 +1,64 @@
+from const import ROWS, COLS
+from bitboard import *
+
+# Attack tables, computed once at import time and indexed by square.
+# Each entry is the bitboard of squares a piece on that square attacks.
+
+KNIGHT_ATTACKS = [knight_attacks(1 << sq) for sq in range(64)]
+KING_ATTACKS = [king_attacks(1 << sq) for sq in range(64)]
+
+# pawn captures, indexed by color index and then square
+PAWN_ATTACKS = [
+    [pawn_attacks(1 << sq, WHITE) for sq in range(64)],
+    [pawn_attacks(1 << sq, BLACK) for sq in range(64)],
+]
+
+# Sliding pieces: one ray per square and direction, running to the edge
+# of the board. The first piece on a ray blocks it, so the attacked part
+# of a ray is the ray minus the ray that starts at that first blocker.
+
+def _ray(sq, row_incr, col_incr):
+    ray = 0
+    row, col = square_coords(sq)
+    row, col = row + row_incr, col + col_incr
+    while 0 <= row < ROWS and 0 <= col < COLS:
+        ray |= 1 << square_index(row, col)
+        row, col = row + row_incr, col + col_incr
+    return ray
+
+# rays towards higher square numbers, their first blocker is the lowest bit
+SOUTH = [_ray(sq, 1, 0) for sq in range(64)]
+EAST = [_ray(sq, 0, 1) for sq in range(64)]
+SOUTH_EAST = [_ray(sq, 1, 1) for sq in range(64)]
+SOUTH_WEST = [_ray(sq, 1, -1) for sq in range(64)]
+
+# rays towards lower square numbers, their first blocker is the highest bit
+NORTH = [_ray(sq, -1, 0) for sq in range(64)]
+WEST = [_ray(sq, 0, -1) for sq in range(64)]
+NORTH_EAST = [_ray(sq, -1, 1) for sq in range(64)]
+NORTH_WEST = [_ray(sq, -1, -1) for sq in range(64)]
+
+def _positive_ray(rays, sq, occupied):
+    ray = rays[sq]
+    blockers = ray & occupied
+    if blockers:
+        ray ^= rays[(blockers & -blockers).bit_length() - 1]
+    return ray
+
+def _negative_ray(rays, sq, occupied):
+    ray = rays[sq]
+    blockers = ray & occupied
+    if blockers:
+        ray ^= rays[blockers.bit_length() - 1]
+    return ray
+
+def bishop_attacks(sq, occupied):
+    return (_positive_ray(SOUTH_EAST, sq, occupied) | _positive_ray(SOUTH_WEST, sq, occupied)
+            | _negative_ray(NORTH_EAST, sq, occupied) | _negative_ray(NORTH_WEST, sq, occupied))
+
+def rook_attacks(sq, occupied):
+    return (_positive_ray(SOUTH, sq, occupied) | _positive_ray(EAST, sq, occupied)
+            | _negative_ray(NORTH, sq, occupied) | _negative_ray(WEST, sq, occupied))
+
+def queen_attacks(sq, occupied):
+    return bishop_attacks(sq, occupied) | rook_attacks(sq, occupied)
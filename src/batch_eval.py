@@ -0,0 +1,48 @@
+import numpy as np
+
+from bitboard import *
+from evaluation import PIECE_SQUARE, PIECE_SQUARE_ENDGAME, PHASE_WEIGHTS, MAX_PHASE
+
+# Batch evaluation of many positions at once, for offline work such as
+# opening book building, tuning and regression suites. Positions are encoded
+# as N x 12 x 64 arrays of 0/1 piece planes: white pawns to king, then black
+# pawns to king, each plane indexed by square. Scores cover the material and
+# piece-square terms of Board.evaluate, tapered by game phase the same way.
+
+PLANES = 12
+
+def _weights(piece_square):
+    # one row per plane, black's values negated so a dot product gives white's score
+    weights = np.zeros((PLANES, 64), dtype=np.int64)
+    for kind in PIECE_TYPES:
+        weights[kind] = piece_square[WHITE][kind]
+        weights[6 + kind] = [-value for value in piece_square[BLACK][kind]]
+    return weights.reshape(PLANES * 64)
+
+MIDDLEGAME_WEIGHTS = _weights(PIECE_SQUARE)
+ENDGAME_WEIGHTS = _weights(PIECE_SQUARE_ENDGAME)
+PHASE_PLANE_WEIGHTS = np.array(PHASE_WEIGHTS * 2, dtype=np.int64)
+
+def encode(boards):
+    '''
+        Encodes a sequence of boards as an N x 12 x 64 uint8 array of piece planes
+    '''
+    bitboards = np.array([board.bitboards[WHITE] + board.bitboards[BLACK] for board in boards], dtype=np.uint64)
+    # little-endian bytes put square 0 in the lowest bit of the first byte
+    planes = bitboards.reshape(len(boards), PLANES).astype('<u8').view(np.uint8).reshape(len(boards), PLANES, 8)
+    return np.unpackbits(planes, axis=2, bitorder='little')
+
+def evaluate_planes(planes, player_color='white'):
+    '''
+        Scores an N x 12 x 64 array of piece planes in centipawns, from the point of view of player_color
+    '''
+    n = planes.shape[0]
+    flat = planes.reshape(n, PLANES * 64)
+    mg = flat @ MIDDLEGAME_WEIGHTS
+    eg = flat @ ENDGAME_WEIGHTS
+    phase = np.minimum(planes.sum(axis=2, dtype=np.int64) @ PHASE_PLANE_WEIGHTS, MAX_PHASE)
+    score = (mg * phase + eg * (MAX_PHASE - phase)) // MAX_PHASE
+    return score if player_color == 'white' else -score
+
+def evaluate_boards(boards, player_color='white'):
+    return evaluate_planes(encode(boards), player_color)
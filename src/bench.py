@@ -0,0 +1,88 @@
+import argparse
+import json
+import sys
+
+from board import Board, START_FEN
+from move import move_name
+from search import Search
+from transposition import TranspositionTable
+
+# Fixed positions for tracking engine speed between releases. Every position is
+# searched to a fixed depth, where the node counts should only change with the
+# search itself, and again for a fixed time, which measures how deep it gets.
+SUITE = [
+    ('startpos', START_FEN),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'),
+    ('italian', 'r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 0 5'),
+    ('middlegame', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10'),
+    ('rook_endgame', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1'),
+    ('pawn_endgame', '8/8/1p3k2/p1p5/P1P2K2/1P6/8/8 w - - 0 1'),
+]
+
+DEPTH = 4
+TIME_LIMIT = 1.0 # seconds
+
+def bench(name, fen, depth=None, time_limit=None, hash_size=16):
+    '''
+        Searches one position with a fresh transposition table and returns its statistics
+    '''
+    board = Board()
+    player_color = board.set_fen(fen)
+    tt = TranspositionTable(hash_size)
+    iterations = []
+    search = Search(board, max_depth=depth or 64, time_limit=time_limit, tt=tt, info=iterations.append)
+    result = search.search(player_color)
+
+    # nodes spent on each iteration, the counts of the results are running totals
+    nodes = [iteration.nodes for iteration in iterations]
+    iteration_nodes = [n - previous for n, previous in zip(nodes, [0] + nodes)]
+    # effective branching factor: the average growth of an iteration over the one before
+    branching = None
+    if len(iteration_nodes) > 1 and iteration_nodes[0]:
+        branching = round((iteration_nodes[-1] / iteration_nodes[0]) ** (1 / (len(iteration_nodes) - 1)), 2)
+
+    return {
+        'name': name,
+        'fen': fen,
+        'limit': {'depth': depth} if depth else {'time': time_limit},
+        'depth': result.depth,
+        'score': result.score,
+        'best_move': move_name(board.encode(result.move)),
+        'nodes': search.nodes,
+        'time': round(result.elapsed, 4),
+        'nps': int(search.nodes / result.elapsed) if result.elapsed > 0 else 0,
+        'time_to_depth': {iteration.depth: round(iteration.elapsed, 4) for iteration in iterations},
+        'branching_factor': branching,
+        'tt_hit_rate': round(tt.hits / tt.probes, 4) if tt.probes else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the search over a fixed suite of positions')
+    parser.add_argument('--depth', type=int, default=DEPTH, help='depth of the fixed depth runs')
+    parser.add_argument('--time', type=float, default=TIME_LIMIT, help='seconds per position of the timed runs')
+    parser.add_argument('--hash', type=int, default=16, help='transposition table size in MB')
+    parser.add_argument('--output', help='write the JSON report to a file instead of stdout')
+    args = parser.parse_args()
+
+    results = []
+    for name, fen in SUITE:
+        results.append(bench(name, fen, depth=args.depth, hash_size=args.hash))
+        results.append(bench(name, fen, time_limit=args.time, hash_size=args.hash))
+
+    nodes = sum(result['nodes'] for result in results)
+    elapsed = sum(result['time'] for result in results)
+    report = {
+        'positions': results,
+        'total': {'nodes': nodes, 'time': round(elapsed, 4), 'nps': int(nodes / elapsed) if elapsed > 0 else 0},
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+from const import COLS
+
+# Squares are numbered row * 8 + col, so square 0 is a8 (top left of the
+# screen) and square 63 is h1. Bit n of a bitboard is set when square n is.
+
+# colors
+WHITE = 0
+BLACK = 1
+COLORS = ('white', 'black')
+COLOR_INDEX = {'white': WHITE, 'black': BLACK}
+
+# piece types
+PAWN = 0
+KNIGHT = 1
+BISHOP = 2
+ROOK = 3
+QUEEN = 4
+KING = 5
+PIECE_TYPES = range(6)
+
+# masks
+FULL = (1 << 64) - 1
+FILE_A = 0x0101010101010101
+FILE_B = FILE_A << 1
+FILE_G = FILE_A << 6
+FILE_H = FILE_A << 7
+NOT_FILE_A = FULL ^ FILE_A
+NOT_FILE_H = FULL ^ FILE_H
+NOT_FILE_AB = FULL ^ (FILE_A | FILE_B)
+NOT_FILE_GH = FULL ^ (FILE_G | FILE_H)
+
+# castling rights
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+ALL_CASTLING = 15
+
+
+def square_index(row, col):
+    return row * COLS + col
+
+def square_coords(sq):
+    return divmod(sq, COLS)
+
+def bit(sq):
+    return 1 << sq
+
+def popcount(bb):
+    return bin(bb).count('1')
+
+def lsb(bb):
+    return (bb & -bb).bit_length() - 1
+
+def iter_bits(bb):
+    while bb:
+        b = bb & -bb
+        yield b.bit_length() - 1
+        bb ^= b
+
+# shifts (north is towards row 0, i.e. towards black's back rank)
+
+def north(bb):
+    return bb >> 8
+
+def south(bb):
+    return (bb << 8) & FULL
+
+def east(bb):
+    return (bb << 1) & NOT_FILE_A & FULL
+
+def west(bb):
+    return (bb >> 1) & NOT_FILE_H
+
+# set-wise attacks
+
+def knight_attacks(bb):
+    attacks = ((bb << 17) & NOT_FILE_A) | ((bb << 15) & NOT_FILE_H)
+    attacks |= ((bb << 10) & NOT_FILE_AB) | ((bb << 6) & NOT_FILE_GH)
+    attacks |= ((bb >> 17) & NOT_FILE_H) | ((bb >> 15) & NOT_FILE_A)
+    attacks |= ((bb >> 10) & NOT_FILE_GH) | ((bb >> 6) & NOT_FILE_AB)
+    return attacks & FULL
+
+def king_attacks(bb):
+    attacks = east(bb) | west(bb)
+    bb |= attacks
+    attacks |= north(bb) | south(bb)
+    return attacks
+
+def pawn_attacks(bb, color):
+    bb = north(bb) if color == WHITE else south(bb)
+    return east(bb) | west(bb)
@@ -1,621 +1,675 @@
 from const import *
 from square import Square
 from piece import *
-from move import Move
-from sound import Sound
-import copy
+from move import *
+from bitboard import *
+from attacks import *
+from zobrist import *
+from evaluation import *
 import os
 
+PIECE_CLASSES = (Pawn, Knight, Bishop, Rook, Queen, King)
+PIECE_KIND = {cls: kind for kind, cls in enumerate(PIECE_CLASSES)}
+
+# the (color, kind) pair stored in the mailbox for every piece
+PIECES = [[(c, kind) for kind in PIECE_TYPES] for c in (WHITE, BLACK)]
+
+# castling rights lost when a piece leaves or lands on one of these squares
+CASTLING_MASK = [ALL_CASTLING] * 64
+CASTLING_MASK[square_index(7, 4)] ^= WHITE_KINGSIDE | WHITE_QUEENSIDE
+CASTLING_MASK[square_index(7, 7)] ^= WHITE_KINGSIDE
+CASTLING_MASK[square_index(7, 0)] ^= WHITE_QUEENSIDE
+CASTLING_MASK[square_index(0, 4)] ^= BLACK_KINGSIDE | BLACK_QUEENSIDE
+CASTLING_MASK[square_index(0, 7)] ^= BLACK_KINGSIDE
+CASTLING_MASK[square_index(0, 0)] ^= BLACK_QUEENSIDE
+
+# the last rank of either side, where pawns promote
+PROMOTION_RANKS = 0xFF | 0xFF << 56
+PROMOTIONS = (QUEEN, KNIGHT, ROOK, BISHOP)
+
+# FEN letters of the piece kinds, upper case for white
+FEN_PIECES = 'pnbrqk'
+FEN_CASTLING = (('K', WHITE_KINGSIDE), ('Q', WHITE_QUEENSIDE), ('k', BLACK_KINGSIDE), ('q', BLACK_QUEENSIDE))
+# the color, king square and rook square each castling right needs
+CASTLING_HOMES = ((WHITE_KINGSIDE, WHITE, square_index(7, 4), square_index(7, 7)),
+                  (WHITE_QUEENSIDE, WHITE, square_index(7, 4), square_index(7, 0)),
+                  (BLACK_KINGSIDE, BLACK, square_index(0, 4), square_index(0, 7)),
+                  (BLACK_QUEENSIDE, BLACK, square_index(0, 4), square_index(0, 0)))
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
 class Board:
     def __init__(self):
-        self.squares = [[None for _ in range(COLS)] for _ in range(ROWS)]
+        # one bitboard per color and piece type, plus occupancy masks
+        self.bitboards = [[0] * 6, [0] * 6]
+        self.occupancy = [0, 0]
+        self.occupied = 0
+        # piece lists, kept up to date alongside the bitboards
+        self.mailbox = [None] * 64
+        self.piece_lists = [[set() for _ in PIECE_TYPES], [set() for _ in PIECE_TYPES]]
+        self.king_squares = [None, None]
+        # middlegame and endgame material and piece-square score of each side, and the game phase
+        self.scores = [0, 0]
+        self.endgame_scores = [0, 0]
+        self.phase = 0
+        self.castling = ALL_CASTLING
+        self.en_passant = None
+        # Zobrist key of the position, without the side to move
+        self.hash = CASTLING_KEYS[ALL_CASTLING]
+        # Zobrist key of the pawns alone, for the pawn structure cache
+        self.pawn_hash = 0
         self.move_history = []
-        self.last_move = None 
-        self._create()
+        self.last_move = None
+        self._squares = None
         self._add_pieces('white')
         self._add_pieces('black')
 
-    def evaluate(self):
-        piece_value = {
-            Pawn: 1, Knight: 3, Bishop: 3,
-            Rook: 5, Queen: 9, King: 1000
-        }
-        score = 0
-        for row in self.squares:
-            for square in row:
-                piece = square.piece
-                if piece:
-                    value = piece_value[type(piece)]
-                    if piece.color == 'black':  # Assuming AI is black
-                        score += value
-                    else:
-                        score -= value
-        return score
-    
-    def minimax(self, depth, maximizingPlayer):
-        if depth == 0 or self.is_game_over():
-            return self.evaluate()
-
-        if maximizingPlayer:
-            maxEval = float('-inf')
-            for move in self.get_all_possible_moves('black'):  # Assuming AI is black
-                self.move_piece(move)
-                evaluation = self.minimax(depth - 1, False)
-                self.undo_move(move)
-                maxEval = max(maxEval, evaluation)
-            return maxEval
+    @property
+    def squares(self):
+        # the Square grid is only a view of the bitboards, built on demand
+        if self._squares is None:
+            self._create()
+        return self._squares
+
+    def copy(self):
+        board = Board.__new__(Board)
+        board.bitboards = [list(self.bitboards[WHITE]), list(self.bitboards[BLACK])]
+        board.occupancy = list(self.occupancy)
+        board.occupied = self.occupied
+        board.mailbox = list(self.mailbox)
+        board.piece_lists = [[set(squares) for squares in self.piece_lists[c]] for c in (WHITE, BLACK)]
+        board.king_squares = list(self.king_squares)
+        board.scores = list(self.scores)
+        board.endgame_scores = list(self.endgame_scores)
+        board.phase = self.phase
+        board.castling = self.castling
+        board.en_passant = self.en_passant
+        board.hash = self.hash
+        board.pawn_hash = self.pawn_hash
+        board.move_history = []
+        board.last_move = self.last_move
+        board._squares = None
+        return board
+
+    def set_fen(self, fen):
+        '''
+            Set up the position of a FEN string and return the color to move. The move
+            counters are ignored, the board does not keep them. Castling rights and an
+            en passant square the pieces do not allow are dropped. Raises ValueError for
+            a string that is not a legal position
+        '''
+        fields = fen.split()
+        if not fields:
+            raise ValueError('empty fen')
+        placement = fields[0]
+        # missing fields default to white to move, no castling and no en passant
+        side = fields[1] if len(fields) > 1 else 'w'
+        castling = fields[2] if len(fields) > 2 else '-'
+        en_passant = fields[3] if len(fields) > 3 else '-'
+        if side not in ('w', 'b'):
+            raise ValueError(f'bad side to move: {side}')
+        if en_passant != '-' and (len(en_passant) != 2 or en_passant[0] not in 'abcdefgh' or en_passant[1] not in '36'):
+            raise ValueError(f'bad en passant square: {en_passant}')
+
+        # read the whole placement before the board is touched
+        pieces = []
+        ranks = placement.split('/')
+        if len(ranks) != ROWS:
+            raise ValueError(f'{len(ranks)} ranks instead of {ROWS}')
+        for row, rank in enumerate(ranks):
+            col = 0
+            for char in rank:
+                if char in '12345678':
+                    col += int(char)
+                elif char.lower() in FEN_PIECES:
+                    if col < COLS:
+                        pieces.append((WHITE if char.isupper() else BLACK, FEN_PIECES.index(char.lower()), square_index(row, col)))
+                    col += 1
+                else:
+                    raise ValueError(f'bad piece: {char}')
+            if col != COLS:
+                raise ValueError(f'rank {8 - row} is {col} squares wide')
+        for c in (WHITE, BLACK):
+            if sum(1 for piece in pieces if piece[:2] == (c, KING)) != 1:
+                raise ValueError(f'{COLORS[c]} needs exactly one king')
+
+        player_color = 'white' if side == 'w' else 'black'
+        placed = {sq: (c, kind) for c, kind, sq in pieces}
+
+        # castling rights need the king and rook on their home squares, or castling
+        # would move pieces that are not there
+        self.castling = 0
+        for char, right in FEN_CASTLING:
+            if char in castling:
+                self.castling |= right
+        for right, c, king, rook in CASTLING_HOMES:
+            if placed.get(king) != (c, KING) or placed.get(rook) != (c, ROOK):
+                self.castling &= ~right
+
+        # an en passant square needs the pawn that just moved two squares past it,
+        # and the square it left and the one it crossed both empty
+        self.en_passant = None
+        if en_passant != '-':
+            sq = square_index(8 - int(en_passant[1]), 'abcdefgh'.index(en_passant[0]))
+            c = BLACK if player_color == 'white' else WHITE
+            step = 8 if c == BLACK else -8
+            if en_passant[1] == ('6' if c == BLACK else '3') and sq not in placed and sq - step not in placed \
+                    and placed.get(sq + step) == (c, PAWN):
+                self.en_passant = sq
+
+        # everything the pieces add up is rebuilt from nothing
+        self.bitboards = [[0] * 6, [0] * 6]
+        self.occupancy = [0, 0]
+        self.occupied = 0
+        self.mailbox = [None] * 64
+        self.piece_lists = [[set() for _ in PIECE_TYPES], [set() for _ in PIECE_TYPES]]
+        self.king_squares = [None, None]
+        self.scores = [0, 0]
+        self.endgame_scores = [0, 0]
+        self.phase = 0
+        self.pawn_hash = 0
+        self.hash = CASTLING_KEYS[self.castling]
+        if self.en_passant is not None:
+            self.hash ^= EN_PASSANT_KEYS[self.en_passant]
+
+        for c, kind, sq in pieces:
+            self._put(c, kind, sq)
+
+        self.move_history = []
+        self.last_move = None
+        self._squares = None
+        # the side that just moved cannot have left its king in check
+        if self.is_in_check('black' if player_color == 'white' else 'white'):
+            raise ValueError('the side not to move is in check')
+        return player_color
+
+    def fen(self, player_color='white'):
+        '''
+            FEN string of the position with player_color to move
+        '''
+        ranks = []
+        for row in range(ROWS):
+            rank, empty = '', 0
+            for col in range(COLS):
+                piece = self.mailbox[square_index(row, col)]
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                rank += FEN_PIECES[piece[1]].upper() if piece[0] == WHITE else FEN_PIECES[piece[1]]
+            ranks.append(rank + str(empty) if empty else rank)
+        castling = ''.join(char for char, right in FEN_CASTLING if self.castling & right) or '-'
+        if self.en_passant is None:
+            en_passant = '-'
         else:
-            minEval = float('inf')
-            for move in self.get_all_possible_moves('white'):
-                self.move_piece(move)
-                evaluation = self.minimax(depth - 1, True)
-                self.undo_move(move)
-                minEval = min(minEval, evaluation)
-            return minEval
-    
-    def move(self, piece, move, testing=False):
-        if move not in piece.moves:
-            raise ValueError("Invalid move")       
-        initial = move.initial
-        final = move.final
+            row, col = square_coords(self.en_passant)
+            en_passant = Square.get_alphacol(col) + str(8 - row)
+        return f"{'/'.join(ranks)} {player_color[0]} {castling} {en_passant} 0 1"
 
-        # Ensure that the move is valid for the piece
-        if move not in piece.moves:
-            raise ValueError("Invalid move")
-        
-        en_passant_empty = self.squares[final.row][final.col].isempty()
+    def piece_at(self, sq):
+        '''
+            Returns the (color, kind) of the piece on a square, or None if it is empty
+        '''
+        return self.mailbox[sq]
 
+    def evaluate(self, player_color='black'):
+        '''
+            Score of the position in centipawns, from the point of view of player_color
+        '''
+        return evaluate_board(self, COLOR_INDEX[player_color])
 
-        if isinstance(piece, Pawn):
-            # en passant capture
-            diff = final.col - initial.col
-            if diff != 0 and en_passant_empty:
-                # console board move update
-                self.squares[initial.row][initial.col + diff].piece = None
-                self.squares[final.row][final.col].piece = piece
-                if not testing:
-                    sound = Sound(os.path.join(
-                        'assets/sounds/capture.wav'
-                    ))
-                    sound.play()
+    def move(self, piece, move, testing=False):
+        # Ensure that the move is valid for the piece
+        if not self.valid_move(piece, move):
+            raise ValueError("Invalid move")
 
-            # pawn promotion
-            else:
-                self.check_promotion(piece, final)
+        initial = move.initial
+        final = move.final
 
-        # king castling
-        if isinstance(piece, King):
-            if self.castling(initial, final) and not testing:
-                diff = final.col - initial.col
-                rook = piece.left_rook if (diff < 0) else piece.right_rook
-                self.move(rook, rook.moves[-1])
-
-        # move
-        piece.moved = True
-
-        # console board move update
-        self.squares[initial.row][initial.col].piece = None
-        self.squares[final.row][final.col].piece = piece
-        self.last_move = move
+        # en passant capture
+        if isinstance(piece, Pawn) and final.col != initial.col and not testing:
+            if self.squares[final.row][final.col].isempty():
+                # imported here so the engine runs without pygame
+                from sound import Sound
+                sound = Sound(os.path.join(
+                    'assets/sounds/capture.wav'
+                ))
+                sound.play()
 
+        self._push(move)
 
     def move_piece(self, move):
+        '''
+            Play a Move if it is legal. Returns whether it was played
+        '''
         initial_square = move.initial
         final_square = move.final
 
         # Check for valid squares
         if not initial_square or not final_square:
             print("Invalid move: Missing initial or final square")
-            return
+            return False
+
+        if not Square.in_range(initial_square.row, initial_square.col, final_square.row, final_square.col):
+            print("Invalid move: Square off the board")
+            return False
 
-        piece = self.squares[initial_square.row][initial_square.col].piece
+        sq = square_index(initial_square.row, initial_square.col)
+        found = self.piece_at(sq)
 
         # Check if there's a piece at the initial square
-        if not piece:
+        if not found:
             print("Invalid move: No piece found at initial square")
-            return
+            return False
 
         # Check if the move is valid for the piece
-        if move not in piece.moves:
+        encoded, c = self.encode(move), found[0]
+        if not self.is_pseudo_legal(encoded, c) or self._leaves_in_check(encoded, c):
             print("Invalid move: Move not in piece's move list")
-            return
-
-        # Capturing a piece, if there's one at the final square
-        captured_piece = self.squares[final_square.row][final_square.col].piece
-
-        # Update pawn's moved property if it's a pawn
-        if isinstance(piece, Pawn):
-            piece.moved = True
-
-        # Now that the move is validated, update the board state
-        # Remove the piece from its initial position
-        self.squares[initial_square.row][initial_square.col].piece = None
-
-        # Place the piece in its final position
-        self.squares[final_square.row][final_square.col].piece = piece
-
-        # Update the piece's position
-        piece.row, piece.col = final_square.row, final_square.col
-
-        # Record the move and the captured piece in move history
-        self.move_history.append((move, captured_piece))
+            return False
 
-        # Update last_move
-        self.last_move = move
+        self._push(move)
+        return True
 
     def undo_move(self):
         if not self.move_history:
             return  # No move to undo
 
-        # Retrieve the last move and the captured piece from the history
-        last_move, captured_piece = self.move_history.pop()
-
-        # Revert the move
-        initial_square = last_move.initial
-        final_square = last_move.final
+        # Retrieve the last move and its undo record from the history
+        _, undo = self.move_history.pop()
+        self.unmake_move(undo)
+        self.last_move = self.move_history[-1][0] if self.move_history else None
 
-        # Move the piece back to its original square
-        piece = self.squares[final_square.row][final_square.col].piece
-        self.squares[initial_square.row][initial_square.col].piece = piece
-        self.squares[final_square.row][final_square.col].piece = captured_piece
-
-        # Update the piece's position back (if your implementation requires it)
-        piece.row, piece.col = initial_square.row, initial_square.col
+    def is_square_attacked(self, sq, c):
+        '''
+            Is the square attacked by a piece of color index c. Works backward from the square,
+            looking for attackers where a knight, pawn, king or slider would have to stand
+        '''
+        bitboards = self.bitboards[c]
+        if KNIGHT_ATTACKS[sq] & bitboards[KNIGHT]:
+            return True
+        if PAWN_ATTACKS[c ^ 1][sq] & bitboards[PAWN]:
+            return True
+        if KING_ATTACKS[sq] & bitboards[KING]:
+            return True
+        queens = bitboards[QUEEN]
+        if bishop_attacks(sq, self.occupied) & (bitboards[BISHOP] | queens):
+            return True
+        return bool(rook_attacks(sq, self.occupied) & (bitboards[ROOK] | queens))
 
     def is_in_check(self, player_color):
-        # Find the king's position
-        king_pos = None
-        for row in self.squares:
-            for square in row:
-                piece = square.piece
-                if piece and piece.color == player_color and isinstance(piece, King):
-                    king_pos = (square.row, square.col)
-                    break
-            if king_pos:
-                break
-
-        # Check if any opponent's pieces can attack the king
-        opponent_color = 'black' if player_color == 'white' else 'white'
-        for row in self.squares:
-            for square in row:
-                piece = square.piece
-                if piece and piece.color == opponent_color:
-                    self.calc_moves(piece, square.row, square.col, bool=True)
-                    for move in piece.moves:
-                        if move.final.row == king_pos[0] and move.final.col == king_pos[1]:
-                            return True
-        return False
+        c = COLOR_INDEX[player_color]
+        king = self.king_squares[c]
+        return king is not None and self.is_square_attacked(king, c ^ 1)
 
     def is_checkmate(self, player_color):
-        if not self.is_in_check(player_color):
-            return False
+        return self.is_in_check(player_color) and not self._has_legal_move(COLOR_INDEX[player_color])
 
-        for row in self.squares:
-            for square in row:
-                piece = square.piece
-                if piece and piece.color == player_color:
-                    self.calc_moves(piece, square.row, square.col, bool=True)
-                    for move in piece.moves:
-                        self.move_piece(move)
-                        if not self.is_in_check(player_color):
-                            self.undo_move()
-                            return False
-                        self.undo_move()
-        return True
-    
     def is_stalemate(self, player_color):
-        if self.is_in_check(player_color):
-            return False
-
-        for row in self.squares:
-            for square in row:
-                piece = square.piece
-                if piece and piece.color == player_color:
-                    self.calc_moves(piece, square.row, square.col, bool=True)
-                    if piece.moves:
-                        return False
-        return True
+        return not self.is_in_check(player_color) and not self._has_legal_move(COLOR_INDEX[player_color])
 
     def is_game_over(self):
         return self.is_checkmate('white') or self.is_checkmate('black') or self.is_stalemate('white') or self.is_stalemate('black')
-     
+
 
     def valid_move(self, piece, move):
-        return move in piece.moves 
-    
-    def check_promotion(self, piece, final):
-        if final.row == 0 or final.row == 7:
-            self.squares[final.row][final.col].piece = Queen(piece.color)
-
-    def castling(self, initial, final):
-        return abs(initial.col - final.col) == 2 
-    
-    def set_true_en_passant(self, piece):
-        
-        if not isinstance(piece, Pawn):
-            return
+        # a drag released outside the window gives a square off the board
+        if not Square.in_range(move.initial.row, move.initial.col, move.final.row, move.final.col):
+            return False
+        sq = square_index(move.initial.row, move.initial.col)
+        c, kind = COLOR_INDEX[piece.color], PIECE_KIND[type(piece)]
+        if self.mailbox[sq] != PIECES[c][kind]:
+            return False
+        move = self.encode(move)
+        return self.is_pseudo_legal(move, c) and not self._leaves_in_check(move, c)
 
-        for row in range(ROWS):
-            for col in range(COLS):
-                if isinstance(self.squares[row][col].piece, Pawn):
-                    self.squares[row][col].piece.en_passant = False
-        
-        piece.en_passant = True
-    
     def in_check(self, piece, move):
-        temp_piece = copy.deepcopy(piece)
-        temp_board = copy.deepcopy(self)
+        return self._leaves_in_check(self.encode(move), COLOR_INDEX[piece.color])
 
-        # Update temp_piece's position to match the initial position of the move
-        temp_piece.row = move.initial.row
-        temp_piece.col = move.initial.col
+    def get_all_possible_moves(self, player_color):
+        return [self.to_move(move) for move in self.generate_moves(COLOR_INDEX[player_color])]
 
-        # Recalculate moves for temp_piece on temp_board
-        temp_board.calc_moves(temp_piece, temp_piece.row, temp_piece.col, bool=False)
+    def generate_moves(self, c, captures_only=False):
+        '''
+            Legal moves of color index c, encoded as ints (see move.py), as used by the search.
+            With captures_only, just the captures and queen promotions
+        '''
+        moves = []
+        for kind in PIECE_TYPES:
+            for sq in tuple(self.piece_lists[c][kind]):
+                for move in self._piece_moves(sq, c, kind, captures_only):
+                    if not self._leaves_in_check(move, c):
+                        moves.append(move)
+        return moves
+
+    def pseudo_moves(self, c, captures_only=False):
+        '''
+            Generates the pseudo-legal moves of color index c, encoded as ints.
+            They can still leave the king in check, try_move weeds those out when they are played
+        '''
+        for kind in PIECE_TYPES:
+            for sq in tuple(self.piece_lists[c][kind]):
+                yield from self._piece_moves(sq, c, kind, captures_only)
+
+    def is_pseudo_legal(self, move, c):
+        initial, final = move & 63, move >> 6 & 63
+        piece = self.mailbox[initial]
+        if piece is None or piece[0] != c or not self._targets(initial, c, piece[1]) & (1 << final):
+            return False
+        # pawns reaching the last rank promote, nothing else does
+        return bool(move >> 12) == (piece[1] == PAWN and bool(PROMOTION_RANKS & (1 << final)))
 
-        # Simulate the move
-        temp_board.move(temp_piece, move, testing=True)
+    def try_move(self, move):
+        '''
+            make_move for a pseudo-legal move. Returns None, leaving the board as it was,
+            if the move would leave the mover's king in check
+        '''
+        c = self.mailbox[move & 63][0]
+        undo = self.make_move(move)
+        king = self.king_squares[c]
+        if king is not None and self.is_square_attacked(king, c ^ 1):
+            self.unmake_move(undo)
+            return None
+        return undo
+
+    def to_move(self, move):
+        '''
+            The Move object of an encoded move
+        '''
+        initial, final = square_coords(move & 63), square_coords(move >> 6 & 63)
+        return Move(Square(*initial), Square(*final), move >> 12 or None)
 
-        # Check if this simulated move puts the king in check
-        for row in range(ROWS):
-            for col in range(COLS):
-                if temp_board.squares[row][col].has_enemy_piece(piece.color):
-                    p = temp_board.squares[row][col].piece
-                    temp_board.calc_moves(p, row, col, bool=False)
-                    for m in p.moves:
-                        if isinstance(m.final.piece, King):
-                            return True
+    def encode(self, move):
+        '''
+            The int encoding of a Move object. Pawns reaching the last rank become a queen
+            unless the move says otherwise
+        '''
+        initial = square_index(move.initial.row, move.initial.col)
+        final = square_index(move.final.row, move.final.col)
+        promotion = move.promotion or 0
+        piece = self.mailbox[initial]
+        if not promotion and piece is not None and piece[1] == PAWN and PROMOTION_RANKS & (1 << final):
+            promotion = QUEEN
+        return encode_move(initial, final, promotion)
+
+
+    def calc_moves(self, piece, row, col, bool=True):
+        '''
+            Calculate all the possible (valid) moves of a specifc piece on a specific position
+        '''
+        sq = square_index(row, col)
+        c, kind = COLOR_INDEX[piece.color], PIECE_KIND[type(piece)]
+        moves = self._legal_moves(sq, c, kind) if bool else self._piece_moves(sq, c, kind)
+        # the GUI always promotes to a queen
+        return [self.to_move(move) for move in moves if move >> 12 in (0, QUEEN)]
+
+    def _legal_moves(self, sq, c, kind):
+        return [move for move in self._piece_moves(sq, c, kind) if not self._leaves_in_check(move, c)]
 
+    def _piece_moves(self, sq, c, kind, captures_only=False):
+        '''
+            Encoded pseudo-legal moves of a piece. A pawn reaching the last rank gets
+            one move per promotion, or just the queen one with captures_only
+        '''
+        targets = self._captures(sq, c, kind) if captures_only else self._targets(sq, c, kind)
+        if kind == PAWN and targets & PROMOTION_RANKS:
+            promotions = (QUEEN,) if captures_only else PROMOTIONS
+            return [sq | target << 6 | promotion << 12 for target in iter_bits(targets) for promotion in promotions]
+        return [sq | target << 6 for target in iter_bits(targets)]
+
+    def _has_legal_move(self, c):
+        for kind in PIECE_TYPES:
+            for sq in tuple(self.piece_lists[c][kind]):
+                for move in self._piece_moves(sq, c, kind):
+                    if not self._leaves_in_check(move, c):
+                        return True
         return False
-    
-    def get_all_possible_moves(self, player_color):
-        all_moves = []
-        for row in self.squares:
-            for square in row:
-                piece = square.piece
-                if piece and piece.color == player_color:
-                    self.calc_moves(piece, square.row, square.col, bool=True)
-                    all_moves.extend(piece.moves)
-        return all_moves
 
+    def _leaves_in_check(self, move, c):
+        undo = self.make_move(move)
+        king = self.king_squares[c]
+        check = king is not None and self.is_square_attacked(king, c ^ 1)
+        self.unmake_move(undo)
+        return check
 
-    def calc_moves(self, piece, row, col, bool=True):
+    def _targets(self, sq, c, kind):
+        '''
+            Bitboard of the pseudo-legal target squares of a piece
+        '''
+        b = 1 << sq
+        own = self.occupancy[c]
+
+        if kind == PAWN:
+            empty = FULL ^ self.occupied
+            if c == WHITE:
+                pushes = north(b) & empty
+                if sq >> 3 == 6:
+                    pushes |= north(pushes) & empty
+            else:
+                pushes = south(b) & empty
+                if sq >> 3 == 1:
+                    pushes |= south(pushes) & empty
+            captures = self.occupancy[c ^ 1]
+            if self.en_passant is not None and self.en_passant >> 3 == (2 if c == WHITE else 5):
+                captures |= 1 << self.en_passant
+            return pushes | (PAWN_ATTACKS[c][sq] & captures)
+
+        if kind == KNIGHT:
+            return KNIGHT_ATTACKS[sq] & ~own
+
+        if kind == BISHOP:
+            return bishop_attacks(sq, self.occupied) & ~own
+
+        if kind == ROOK:
+            return rook_attacks(sq, self.occupied) & ~own
+
+        if kind == QUEEN:
+            return queen_attacks(sq, self.occupied) & ~own
+
+        # king
+        targets = KING_ATTACKS[sq] & ~own
+        rights = self.castling & (WHITE_KINGSIDE | WHITE_QUEENSIDE if c == WHITE else BLACK_KINGSIDE | BLACK_QUEENSIDE)
+        if rights and not self.is_square_attacked(sq, c ^ 1):
+            # king castling
+            if rights & (WHITE_KINGSIDE | BLACK_KINGSIDE) and not self.occupied & ((b << 1) | (b << 2)):
+                if not self.is_square_attacked(sq + 1, c ^ 1) and not self.is_square_attacked(sq + 2, c ^ 1):
+                    targets |= b << 2
+            # queen castling
+            if rights & (WHITE_QUEENSIDE | BLACK_QUEENSIDE) and not self.occupied & ((b >> 1) | (b >> 2) | (b >> 3)):
+                if not self.is_square_attacked(sq - 1, c ^ 1) and not self.is_square_attacked(sq - 2, c ^ 1):
+                    targets |= b >> 2
+        return targets
+
+    def _captures(self, sq, c, kind):
         '''
-            Calculate all the possible (valid) moves of a specifc piece on a specific position 
-        '''
-        # Clear existing moves before calculating new ones
-        piece.clear_moves()
-
-        def pawn_moves():
-    
-            move = None  # Initialize move to None at the beginning
-            # Steps
-            steps = 1 if piece.moved else 2
-
-            # vertical moves
-            start = row + piece.dir
-            end = row + (piece.dir * (1 + steps))
-            for possible_move_row in range(start, end, piece.dir):
-                if Square.in_range(possible_move_row):
-                    if self.squares[possible_move_row][col].isempty():
-                        # create initial and final move squares
-                        initial = Square(row, col)
-                        final = Square(possible_move_row, col)
-                        # create a new move
-                        move = Move(initial, final)
-
-                        # check potencial checks
-                        if bool:
-                            if not self.in_check(piece, move):
-                                # append new move
-                                piece.add_move(move)
-                        else:
-                            # append new move
-                            piece.add_move(move)
-                    # blocked
-                    else: break
-                # not in range
-                else: break
-
-            # diagonal moves
-            possible_move_row = row + piece.dir
-            possible_move_cols = [col-1, col+1]
-            for possible_move_col in possible_move_cols:
-                if Square.in_range(possible_move_row, possible_move_col):
-                    if self.squares[possible_move_row][possible_move_col].has_enemy_piece(piece.color):
-                        # create initial and final move squares
-                        initial = Square(row, col)
-                        final_piece = self.squares[possible_move_row][possible_move_col].piece
-                        final = Square(possible_move_row, possible_move_col, final_piece)
-                        # create a new move
-                        move = Move(initial, final)
-                        
-                        # check potencial checks
-                        if bool:
-                            if not self.in_check(piece, move):
-                                piece.add_move(move)
-                        else:
-                            piece.add_move(move)
-
-            # en passant moves
-            r = 3 if piece.color == 'white' else 4
-            fr = 2 if piece.color == 'white' else 5
-            # left en pessant
-            if Square.in_range(col-1) and row == r:
-                if self.squares[row][col-1].has_enemy_piece(piece.color):
-                    p = self.squares[row][col-1].piece
-                    if isinstance(p, Pawn):
-                        if p.en_passant:
-                            # create initial and final move squares
-                            initial = Square(row, col)
-                            final = Square(fr, col-1, p)
-                            # create a new move
-                            move = Move(initial, final)
-                        
-                        # check potencial checks
-                        if bool:
-                            if not self.in_check(piece, move):
-                                piece.add_move(move)
-                        else:
-                            piece.add_move(move)
-
-            # right en passant
-            if Square.in_range(col+1) and row == r:
-                if self.squares[row][col+1].has_enemy_piece(piece.color):
-                    p = self.squares[row][col+1].piece
-                    if isinstance(p, Pawn):
-                        if p.en_passant:
-                            # create initial and final move squares
-                            initial = Square(row, col)
-                            final = Square(fr, col+1, p)
-                            # create a new move
-                            move = Move(initial, final)
-                        
-                            # check potencial checks
-                            if bool:
-                                if not self.in_check(piece, move):
-                                    piece.add_move(move)
-                            else:
-                                piece.add_move(move)
-                        
-                            
-        def knight_moves():
-            possible_moves = [
-                (row-2, col+1),
-                (row-1, col+2),
-                (row+1, col+2),
-                (row+2, col+1),
-                (row+2, col-1),
-                (row+1, col-2),
-                (row-1, col-2),
-                (row-2, col-1),
-            ]
-
-            for possible_move in possible_moves:
-                possible_move_row, possible_move_col = possible_move 
-                
-                if Square.in_range(possible_move_row, possible_move_col):
-                    if self.squares[possible_move_row][possible_move_col].isempty_or_enemy(piece.color):
-                        # create squares of the new move
-                        initial = Square(row, col)
-                        final_piece = self.squares[possible_move_row][possible_move_col].piece
-                        final = Square(possible_move_row, possible_move_col, final_piece) 
-                        # create a new move
-                        move = Move(initial, final)
-                        
-                        if bool:
-                            if not self.in_check(piece, move):
-                                piece.add_move(move)
-                            else: break
-                        else:
-                            piece.add_move(move)
-        
-        def straightline_moves(incrs):
-            for incr in incrs:
-                row_incr, col_incr = incr
-                possible_move_row = row + row_incr 
-                possible_move_col = col + col_incr
-
-                while True:
-                    if Square.in_range(possible_move_row, possible_move_col):
-                        initial = Square(row, col)
-                        final_piece = self.squares[possible_move_row][possible_move_col].piece
-                        final = Square(possible_move_row, possible_move_col, final_piece)
-                        # create a possible new move
-                        move = Move(initial, final)
-                        
-                        # empty
-                        if self.squares[possible_move_row][possible_move_col].isempty():
-                            if bool:
-                                if not self.in_check(piece, move):
-                                    piece.add_move(move)
-                            else:
-                                piece.add_move(move)
-
-                        # has enemy piece
-                        elif self.squares[possible_move_row][possible_move_col].has_enemy_piece(piece.color):
-                            if bool:
-                                if not self.in_check(piece, move):
-                                    piece.add_move(move)
-                            else:
-                                piece.add_move(move)
-                            break
-
-                        # has a team piece
-                        elif self.squares[possible_move_row][possible_move_col].has_team_piece(piece.color):
-                            break
-
-                    # not in range 
-                    else: break
-
-                    
-                    # incrementing incr
-                    possible_move_row = possible_move_row + row_incr
-                    possible_move_col = possible_move_col + col_incr
-
-        def king_moves():
-            adjs = [
-                (row-1, col+0), # up
-                (row-1, col+1), # up-right
-                (row+0, col+1), # right
-                (row+1, col+1), # down-right
-                (row+1, col+0), # down
-                (row+1, col-1), # down-left
-                (row+0, col-1), #left
-                (row-1, col-1), # up-left
-            ]
-
-            for possible_move in adjs:
-                possible_move_row, possible_move_col = possible_move
-
-                if Square.in_range(possible_move_row, possible_move_col):
-                    if self.squares[possible_move_row][possible_move_col].isempty_or_enemy(piece.color):
-                        # create squares of the new move
-                        initial = Square(row, col)
-                        final = Square(possible_move_row, possible_move_col) 
-                        # create a new move
-                        move = Move(initial, final)
-                        if bool:
-                            if not self.in_check(piece, move):
-                                piece.add_move(move)
-                            else: break
-                        else:
-                            piece.add_move(move)
-
-            # castling moves
-            if not piece.moved:
-                # queen castling
-                left_rook = self.squares[row][0].piece
-                if isinstance(left_rook, Rook):
-                    if not left_rook.moved:
-                        for c in range(1, 4):
-                            if self.squares[row][c].has_piece(): 
-                                break
-
-                            if c == 3:
-                                # adds left rook to king
-                                piece.left_rook = left_rook 
-
-                                # rook move
-                                initial = Square(row, 0)
-                                final = Square(row, 3)
-                                moveR = Move(initial, final)
-
-                                # king move
-                                initial = Square(row, col)
-                                final = Square(row, 2)
-                                moveK = Move(initial, final)
-
-                                if bool:
-                                    if not self.in_check(piece, moveK) and not self.in_check(left_rook, moveR):
-                                        # append new move to rook 
-                                        left_rook.add_move(moveR)                                       
-                                        # append new move to king 
-                                        piece.add_move(moveK)
-                                else:
-                                    # append new move to rook 
-                                    left_rook.add_move(moveR) 
-                                    # append new move to king 
-                                    piece.add_move(moveK)
-                        
-                # king castling
-                right_rook = self.squares[row][7].piece
-                if isinstance(right_rook, Rook):
-                    if not right_rook.moved:
-                        for c in range(5, 7):
-                            if self.squares[row][c].has_piece(): 
-                                break
-
-                            if c == 6:
-                                # adds right rook to king
-                                piece.right_rook = right_rook 
-
-                                # rook move
-                                initial = Square(row, 7)
-                                final = Square(row, 5)
-                                moveR = Move(initial, final)
-
-                                # king move
-                                initial = Square(row, col)
-                                final = Square(row, 6)
-                                moveK = Move(initial, final)
-
-                                if bool:
-                                    if not self.in_check(piece, moveK) and not self.in_check(right_rook, moveR):
-                                        # append new move to rook 
-                                        right_rook.add_move(moveR)                                       
-                                        # append new move to king 
-                                        piece.add_move(moveK)
-                                else:
-                                    # append new move to rook 
-                                    right_rook.add_move(moveR) 
-                                    # append new move to king 
-                                    piece.add_move(moveK)
-       
-        if isinstance(piece, Pawn): 
-            pawn_moves() 
-        
-        elif isinstance(piece, Knight): 
-            knight_moves()
-
-        elif isinstance(piece, Bishop): 
-            straightline_moves([
-                (-1, 1), # up-right
-                (-1, -1), # up-left
-                (1, 1), # down-right
-                (1, -1), # down-left
-            ])
-
-        elif isinstance(piece, Rook): 
-            straightline_moves([
-                (-1, 0), # up
-                (0, 1), # right
-                (1, 0), # down
-                (0, -1), # left
-            ])
-
-        elif isinstance(piece, Queen): 
-            straightline_moves([
-                (-1, 1), # up-right
-                (-1, -1), # up-left
-                (1, 1), # down-right
-                (1, -1), # down-left
-                (-1, 0), # up
-                (0, 1), # right
-                (1, 0), # down
-                (0, -1) # left 
-            ])
-
-        elif isinstance(piece, King): 
-            king_moves()
-            
-          
+            Bitboard of the pseudo-legal captures and promotions of a piece
+        '''
+        enemy = self.occupancy[c ^ 1]
+
+        if kind == PAWN:
+            if self.en_passant is not None and self.en_passant >> 3 == (2 if c == WHITE else 5):
+                enemy |= 1 << self.en_passant
+            targets = PAWN_ATTACKS[c][sq] & enemy
+            # promotion push
+            if sq >> 3 == (1 if c == WHITE else 6):
+                targets |= (1 << (sq - 8 if c == WHITE else sq + 8)) & ~self.occupied
+            return targets
+
+        if kind == KING:
+            return KING_ATTACKS[sq] & enemy
+
+        return self._targets(sq, c, kind) & enemy
+
+    def _push(self, move):
+        undo = self.make_move(self.encode(move))
+        self.move_history.append((move, undo))
+        self.last_move = move
+
+    def make_move(self, move):
+        '''
+            Play an encoded move on the board in place and return the record unmake_move needs to take it back
+        '''
+        initial, final = move & 63, move >> 6 & 63
+        c, kind = self.mailbox[initial]
+        captured = None
+        captured_sq = final
+        promotion = None
+        key = self.hash
+
+        en_passant = self.en_passant
+        if en_passant is not None:
+            self.hash ^= EN_PASSANT_KEYS[en_passant]
+        self.en_passant = None
+
+        # capture
+        if self.mailbox[final]:
+            captured = self.mailbox[final][1]
+            self._remove(c ^ 1, captured, final)
+
+        self._remove(c, kind, initial)
+
+        if kind == PAWN:
+            # en passant capture
+            if final == en_passant and (final - initial) % 8:
+                captured = PAWN
+                captured_sq = final + 8 if c == WHITE else final - 8
+                self._remove(c ^ 1, PAWN, captured_sq)
+            # double step
+            elif abs(final - initial) == 16:
+                self.en_passant = (initial + final) // 2
+                self.hash ^= EN_PASSANT_KEYS[self.en_passant]
+            # pawn promotion
+            if final >> 3 in (0, 7):
+                promotion = move >> 12 or QUEEN
+
+        # king castling
+        elif kind == KING and abs(final - initial) == 2:
+            if final > initial:
+                self._remove(c, ROOK, initial + 3)
+                self._put(c, ROOK, initial + 1)
+            else:
+                self._remove(c, ROOK, initial - 4)
+                self._put(c, ROOK, initial - 1)
+
+        self._put(c, promotion if promotion is not None else kind, final)
+
+        # the castling rights also stand in for the moved flag of kings and rooks
+        castling = self.castling
+        self.castling &= CASTLING_MASK[initial] & CASTLING_MASK[final]
+        if castling != self.castling:
+            self.hash ^= CASTLING_KEYS[castling] ^ CASTLING_KEYS[self.castling]
+
+        # keep the Square view of the position before the move, unmake_move puts it back
+        squares = self._squares
+        self._squares = None
+
+        return (initial, final, c, kind, captured, captured_sq, promotion, castling, en_passant, key, squares)
+
+    def unmake_move(self, undo):
+        '''
+            Take back a move played by make_move, restoring the board from its undo record
+        '''
+        initial, final, c, kind, captured, captured_sq, promotion, castling, en_passant, key, squares = undo
+
+        self._remove(c, promotion if promotion is not None else kind, final)
+        self._put(c, kind, initial)
+
+        # king castling
+        if kind == KING and abs(final - initial) == 2:
+            if final > initial:
+                self._remove(c, ROOK, initial + 1)
+                self._put(c, ROOK, initial + 3)
+            else:
+                self._remove(c, ROOK, initial - 1)
+                self._put(c, ROOK, initial - 4)
+
+        # capture
+        if captured is not None:
+            self._put(c ^ 1, captured, captured_sq)
+
+        self.castling = castling
+        self.en_passant = en_passant
+        self.hash = key
+        self._squares = squares
+
+    def _put(self, c, kind, sq):
+        b = 1 << sq
+        self.bitboards[c][kind] |= b
+        self.occupancy[c] |= b
+        self.occupied |= b
+        self.mailbox[sq] = PIECES[c][kind]
+        self.hash ^= PIECE_KEYS[c][kind][sq]
+        self.scores[c] += PIECE_SQUARE[c][kind][sq]
+        self.endgame_scores[c] += PIECE_SQUARE_ENDGAME[c][kind][sq]
+        self.phase += PHASE_WEIGHTS[kind]
+        if kind == PAWN:
+            self.pawn_hash ^= PIECE_KEYS[c][PAWN][sq]
+        self.piece_lists[c][kind].add(sq)
+        if kind == KING:
+            self.king_squares[c] = sq
+
+    def _remove(self, c, kind, sq):
+        b = 1 << sq
+        self.bitboards[c][kind] &= ~b
+        self.occupancy[c] &= ~b
+        self.occupied &= ~b
+        self.mailbox[sq] = None
+        self.hash ^= PIECE_KEYS[c][kind][sq]
+        self.scores[c] -= PIECE_SQUARE[c][kind][sq]
+        self.endgame_scores[c] -= PIECE_SQUARE_ENDGAME[c][kind][sq]
+        self.phase -= PHASE_WEIGHTS[kind]
+        if kind == PAWN:
+            self.pawn_hash ^= PIECE_KEYS[c][PAWN][sq]
+        self.piece_lists[c][kind].discard(sq)
+        if kind == KING:
+            self.king_squares[c] = None
+
     def _create(self):
-        for row in range(ROWS):
-            for col in range(COLS):
-                self.squares[row][col] = Square(row, col, None)
+        self._squares = [[Square(row, col, None) for col in range(COLS)] for row in range(ROWS)]
+        for c in (WHITE, BLACK):
+            color = COLORS[c]
+            for kind in PIECE_TYPES:
+                for sq in self.piece_lists[c][kind]:
+                    row, col = square_coords(sq)
+                    piece = PIECE_CLASSES[kind](color)
+                    piece.moved = self._has_moved(sq, c, kind)
+                    if kind == PAWN and self.en_passant is not None:
+                        piece.en_passant = sq == self.en_passant + (8 if c == WHITE else -8)
+                    self._squares[row][col].piece = piece
+
+    def _has_moved(self, sq, c, kind):
+        row, col = square_coords(sq)
+        home = 7 if c == WHITE else 0
+        if kind == PAWN:
+            return row != (6 if c == WHITE else 1)
+        if kind == KING:
+            return not self.castling & (CASTLING_MASK[square_index(home, 4)] ^ ALL_CASTLING)
+        if kind == ROOK and row == home and col in (0, 7):
+            return not self.castling & (CASTLING_MASK[sq] ^ ALL_CASTLING)
+        return False
 
     def _add_pieces(self, color):
+        c = COLOR_INDEX[color]
         row_pawn, row_other = (6, 7) if color == 'white' else (1, 0)
 
         # pawns
         for col in range(COLS):
-            self.squares[row_pawn][col] = Square(row_pawn, col, Pawn(color))
+            self._put(c, PAWN, square_index(row_pawn, col))
 
-        # knights 
-        self.squares[row_other][1] = Square(row_other, 1, Knight(color))
-        self.squares[row_other][6] = Square(row_other, 6, Knight(color))
+        # knights
+        self._put(c, KNIGHT, square_index(row_other, 1))
+        self._put(c, KNIGHT, square_index(row_other, 6))
 
-        # bishops 
-        self.squares[row_other][2] = Square(row_other, 2, Bishop(color))
-        self.squares[row_other][5] = Square(row_other, 5, Bishop(color))
+        # bishops
+        self._put(c, BISHOP, square_index(row_other, 2))
+        self._put(c, BISHOP, square_index(row_other, 5))
 
-        # rooks 
-        self.squares[row_other][0] = Square(row_other, 0, Rook(color))
-        self.squares[row_other][7] = Square(row_other, 7, Rook(color))
+        # rooks
+        self._put(c, ROOK, square_index(row_other, 0))
+        self._put(c, ROOK, square_index(row_other, 7))
 
         # Queen and King
-        queen_col, king_col = (3, 4) if color == 'white' else (3, 4)
-        self.squares[row_other][queen_col] = Square(row_other, queen_col, Queen(color))
-        self.squares[row_other][king_col] = Square(row_other, king_col, King(color))
-        
+        self._put(c, QUEEN, square_index(row_other, 3))
+        self._put(c, KING, square_index(row_other, 4))
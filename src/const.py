@@ -5,4 +5,16 @@ HEIGHT = 680
 # Board Dimensions 
 ROWS = 8 
 COLS = 8 
-SQSIZE = WIDTH // COLS 
\ No newline at end of file
+SQSIZE = WIDTH // COLS 
+
+# Frame rate
+FPS = 60 # cap while a piece is dragged
+THINKING_FRAME = 100 # ms between redraws of the thinking label
+
+# AI search limits
+AI_MAX_DEPTH = 64
+AI_TIME_LIMIT = 1.0 # seconds per move
+AI_HASH_SIZE = 16 # transposition table size in MB
+AI_WORKERS = 1 # processes searching in parallel, 1 searches in a thread of the game
+AI_PONDER = True # think on the player's time, with AI_WORKERS = 1 only
+AI_PONDER_TIME_LIMIT = 10.0 # seconds of pondering at most, then the AI sits idle
@@ -1,11 +1,11 @@
-import pygame 
-
 from const import *
+from textures import textures
 
 class Dragger:
 
     def __init__(self):
         self.piece = None
+        self.moves = []
         self.dragging = False
         self.mouseX = 0
         self.mouseY = 0
@@ -23,22 +23,26 @@ class Dragger:
         self.initial_row = pos[1] // SQSIZE
         self.initial_col = pos[0] // SQSIZE 
 
-    def drag_piece(self, piece):
+    def drag_piece(self, piece, moves):
         self.piece = piece
+        self.moves = moves
         self.dragging = True
-        # Resize the piece's texture to make it look bigger when picked up
-        self.piece.set_texture(size=128)
-        self.img = pygame.image.load(piece.texture).convert_alpha()  # load image once 
+        # the bigger texture makes the piece look picked up
+        self.img = textures.get(piece.color, piece.name, size=128)
     
     def update_blit(self, surface):
         if self.piece:
-            img_center = (self.mouseX, self.mouseY)
-            self.piece.texture_rect = self.img.get_rect(center=img_center)
+            self.piece.texture_rect = self.rect()
             surface.blit(self.img, self.piece.texture_rect)
 
+    def rect(self):
+        # the screen area the piece covers while dragged
+        if self.piece:
+            return self.img.get_rect(center=(self.mouseX, self.mouseY))
+        return None
+
     def undrag_piece(self):
-        # Resize the piece's texture back to its original size when dropped
         if self.piece:
-            self.piece.set_texture(size=80)
             self.piece = None
+            self.moves = []
             self.dragging = False
\ No newline at end of file
@@ -0,0 +1,275 @@
+from const import ROWS, COLS
+from bitboard import *
+from attacks import *
+
+# Evaluation terms, in centipawns. The piece-square tables are written from
+# white's point of view with the first row being black's back rank, the same
+# way squares are numbered on the board; black reads them upside down.
+#
+# Every term has a middlegame and an endgame value. The two totals are blended
+# by game phase, which runs from 24 with all minor and major pieces on the
+# board down to 0 with none.
+
+PIECE_VALUES = (100, 320, 330, 500, 900, 20000)
+ENDGAME_VALUES = (120, 300, 320, 520, 900, 20000)
+
+PHASE_WEIGHTS = (0, 1, 1, 2, 4, 0)
+MAX_PHASE = 24
+
+PAWN_TABLE = (
+      0,   0,   0,   0,   0,   0,   0,   0,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     10,  10,  20,  30,  30,  20,  10,  10,
+      5,   5,  10,  25,  25,  10,   5,   5,
+      0,   0,   0,  20,  20,   0,   0,   0,
+      5,  -5, -10,   0,   0, -10,  -5,   5,
+      5,  10,  10, -20, -20,  10,  10,   5,
+      0,   0,   0,   0,   0,   0,   0,   0,
+)
+
+KNIGHT_TABLE = (
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20,   0,   0,   0,   0, -20, -40,
+    -30,   0,  10,  15,  15,  10,   0, -30,
+    -30,   5,  15,  20,  20,  15,   5, -30,
+    -30,   0,  15,  20,  20,  15,   0, -30,
+    -30,   5,  10,  15,  15,  10,   5, -30,
+    -40, -20,   0,   5,   5,   0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+)
+
+BISHOP_TABLE = (
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,  10,  10,   5,   0, -10,
+    -10,   5,   5,  10,  10,   5,   5, -10,
+    -10,   0,  10,  10,  10,  10,   0, -10,
+    -10,  10,  10,  10,  10,  10,  10, -10,
+    -10,   5,   0,   0,   0,   0,   5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+)
+
+ROOK_TABLE = (
+      0,   0,   0,   0,   0,   0,   0,   0,
+      5,  10,  10,  10,  10,  10,  10,   5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+      0,   0,   0,   5,   5,   0,   0,   0,
+)
+
+QUEEN_TABLE = (
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,   5,   5,   5,   0, -10,
+     -5,   0,   5,   5,   5,   5,   0,  -5,
+      0,   0,   5,   5,   5,   5,   0,  -5,
+    -10,   5,   5,   5,   5,   5,   0, -10,
+    -10,   0,   5,   0,   0,   0,   0, -10,
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+)
+
+KING_MIDDLEGAME_TABLE = (
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+     20,  20,   0,   0,   0,   0,  20,  20,
+     20,  30,  10,   0,   0,  10,  30,  20,
+)
+
+PAWN_ENDGAME_TABLE = (
+      0,   0,   0,   0,   0,   0,   0,   0,
+     80,  80,  80,  80,  80,  80,  80,  80,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     30,  30,  30,  30,  30,  30,  30,  30,
+     20,  20,  20,  20,  20,  20,  20,  20,
+     10,  10,  10,  10,  10,  10,  10,  10,
+      0,   0,   0,   0,   0,   0,   0,   0,
+      0,   0,   0,   0,   0,   0,   0,   0,
+)
+
+KING_ENDGAME_TABLE = (
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10,   0,   0, -10, -20, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -30,   0,   0,   0,   0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50,
+)
+
+MIDDLEGAME_TABLES = (PAWN_TABLE, KNIGHT_TABLE, BISHOP_TABLE, ROOK_TABLE, QUEEN_TABLE, KING_MIDDLEGAME_TABLE)
+ENDGAME_TABLES = (PAWN_ENDGAME_TABLE, KNIGHT_TABLE, BISHOP_TABLE, ROOK_TABLE, QUEEN_TABLE, KING_ENDGAME_TABLE)
+
+def _piece_square(values, tables):
+    # material plus piece-square bonus, indexed by color index, kind and square
+    return [
+        [[values[kind] + tables[kind][sq] for sq in range(64)] for kind in PIECE_TYPES],
+        [[values[kind] + tables[kind][sq ^ 56] for sq in range(64)] for kind in PIECE_TYPES],
+    ]
+
+PIECE_SQUARE = _piece_square(PIECE_VALUES, MIDDLEGAME_TABLES)
+PIECE_SQUARE_ENDGAME = _piece_square(ENDGAME_VALUES, ENDGAME_TABLES)
+
+# pawn structure, as (middlegame, endgame) pairs
+DOUBLED_PAWN = (-10, -20)
+ISOLATED_PAWN = (-10, -15)
+# indexed by the rank of the pawn counted from its own side, 1 is its starting rank
+PASSED_PAWN = (
+    (0, 0), (5, 10), (10, 20), (15, 35), (25, 60), (40, 100), (60, 150), (0, 0),
+)
+
+# king safety, middlegame only
+SHIELD_MISSING = -15
+SHIELD_ADVANCED = -5
+OPEN_FILE_NEAR_KING = -10
+
+# mobility bonus per attacked square, indexed by kind
+MOBILITY_MIDDLEGAME = (0, 4, 3, 2, 1, 0)
+MOBILITY_ENDGAME = (0, 4, 3, 4, 2, 0)
+
+FILE_MASKS = [FILE_A << col for col in range(COLS)]
+ADJACENT_FILES = [
+    (FILE_MASKS[col - 1] if col > 0 else 0) | (FILE_MASKS[col + 1] if col < COLS - 1 else 0)
+    for col in range(COLS)
+]
+
+def _ahead(sq, c):
+    # every square in front of sq, as seen by color index c
+    row = sq >> 3
+    rows = range(row) if c == WHITE else range(row + 1, ROWS)
+    return sum(0xFF << (r * 8) for r in rows)
+
+# squares that must be free of enemy pawns for a pawn to be passed, indexed by color index and square
+PASSED_MASKS = [
+    [_ahead(sq, c) & (FILE_MASKS[sq & 7] | ADJACENT_FILES[sq & 7]) for sq in range(64)]
+    for c in (WHITE, BLACK)
+]
+
+class PawnHashTable:
+    '''
+        Fixed-size cache of pawn structure scores, indexed by the pawn-only Zobrist key
+    '''
+
+    def __init__(self, size=16384):
+        self.size = size
+        self.entries = [None] * size
+
+    def probe(self, key):
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            return entry[1]
+        return None
+
+    def store(self, key, scores):
+        self.entries[key % self.size] = (key, scores)
+
+# shared by every board, pawn structures repeat across games as much as within one
+pawn_table = PawnHashTable()
+
+def pawn_structure(board):
+    '''
+        Middlegame and endgame pawn structure score from white's point of view
+    '''
+    scores = pawn_table.probe(board.pawn_hash)
+    if scores is None:
+        scores = _pawn_structure(board.bitboards[WHITE][PAWN], board.bitboards[BLACK][PAWN])
+        pawn_table.store(board.pawn_hash, scores)
+    return scores
+
+def _pawn_structure(white_pawns, black_pawns):
+    mg = eg = 0
+    for c, pawns, enemy_pawns, sign in ((WHITE, white_pawns, black_pawns, 1), (BLACK, black_pawns, white_pawns, -1)):
+        for col in range(COLS):
+            on_file = popcount(pawns & FILE_MASKS[col])
+            if not on_file:
+                continue
+            # doubled
+            if on_file > 1:
+                mg += sign * DOUBLED_PAWN[0] * (on_file - 1)
+                eg += sign * DOUBLED_PAWN[1] * (on_file - 1)
+            # isolated
+            if not pawns & ADJACENT_FILES[col]:
+                mg += sign * ISOLATED_PAWN[0] * on_file
+                eg += sign * ISOLATED_PAWN[1] * on_file
+        # passed
+        for sq in iter_bits(pawns):
+            if not enemy_pawns & PASSED_MASKS[c][sq]:
+                rank = 7 - (sq >> 3) if c == WHITE else sq >> 3
+                mg += sign * PASSED_PAWN[rank][0]
+                eg += sign * PASSED_PAWN[rank][1]
+    return mg, eg
+
+def king_safety(board, c):
+    '''
+        Middlegame penalty for a king of color index c without a pawn shield
+    '''
+    king = board.king_squares[c]
+    if king is None:
+        return 0
+    pawns = board.bitboards[c][PAWN]
+    all_pawns = pawns | board.bitboards[c ^ 1][PAWN]
+    row, col = square_coords(king)
+    step = -1 if c == WHITE else 1
+    score = 0
+    for f in range(max(col - 1, 0), min(col + 2, COLS)):
+        shield = pawns & FILE_MASKS[f]
+        if 0 <= row + step < ROWS and shield & (1 << square_index(row + step, f)):
+            continue
+        if 0 <= row + 2 * step < ROWS and shield & (1 << square_index(row + 2 * step, f)):
+            score += SHIELD_ADVANCED
+        else:
+            score += SHIELD_MISSING
+        if not all_pawns & FILE_MASKS[f]:
+            score += OPEN_FILE_NEAR_KING
+    return score
+
+def mobility(board, c):
+    '''
+        Middlegame and endgame bonus for the squares the pieces of color index c attack
+    '''
+    bitboards = board.bitboards[c]
+    occupied = board.occupied
+    free = ~board.occupancy[c]
+    mg = eg = 0
+    for sq in iter_bits(bitboards[KNIGHT]):
+        n = popcount(KNIGHT_ATTACKS[sq] & free)
+        mg += MOBILITY_MIDDLEGAME[KNIGHT] * n
+        eg += MOBILITY_ENDGAME[KNIGHT] * n
+    for sq in iter_bits(bitboards[BISHOP]):
+        n = popcount(bishop_attacks(sq, occupied) & free)
+        mg += MOBILITY_MIDDLEGAME[BISHOP] * n
+        eg += MOBILITY_ENDGAME[BISHOP] * n
+    for sq in iter_bits(bitboards[ROOK]):
+        n = popcount(rook_attacks(sq, occupied) & free)
+        mg += MOBILITY_MIDDLEGAME[ROOK] * n
+        eg += MOBILITY_ENDGAME[ROOK] * n
+    for sq in iter_bits(bitboards[QUEEN]):
+        n = popcount(queen_attacks(sq, occupied) & free)
+        mg += MOBILITY_MIDDLEGAME[QUEEN] * n
+        eg += MOBILITY_ENDGAME[QUEEN] * n
+    return mg, eg
+
+def evaluate_board(board, c):
+    '''
+        Tapered evaluation of the board in centipawns, from the point of view of color index c
+    '''
+    # material and piece-square tables, kept up to date by the board
+    mg = board.scores[WHITE] - board.scores[BLACK]
+    eg = board.endgame_scores[WHITE] - board.endgame_scores[BLACK]
+
+    pawn_mg, pawn_eg = pawn_structure(board)
+    white_mg, white_eg = mobility(board, WHITE)
+    black_mg, black_eg = mobility(board, BLACK)
+    mg += pawn_mg + white_mg - black_mg + king_safety(board, WHITE) - king_safety(board, BLACK)
+    eg += pawn_eg + white_eg - black_eg
+
+    phase = min(board.phase, MAX_PHASE)
+    score = (mg * phase + eg * (MAX_PHASE - phase)) // MAX_PHASE
+    return score if c == WHITE else -score
@@ -1,10 +1,11 @@
 import pygame
-from const import ROWS, COLS, SQSIZE, HEIGHT
+from const import ROWS, COLS, SQSIZE, WIDTH, HEIGHT
 from typing import Any
 from board import Board
 from dragger import Dragger 
 from config import Config
 from square import Square
+from textures import textures
 
 class Game:
 
@@ -14,10 +15,24 @@ class Game:
         self.board = Board()
         self.dragger = Dragger()
         self.config = Config()
+        # board and coordinates of each theme, drawn once
+        self.backgrounds = {}
+        # squares to redraw on the next frame
+        self.dirty = set()
+        self.mark_all()
+        # text of the 'Thinking' label on screen, None when hidden
+        self.thinking = None
 
     # Show methods
 
-    def show_bg(self, surface):      
+    def background(self):
+        if self.config.idx not in self.backgrounds:
+            bg = pygame.Surface((WIDTH, HEIGHT)).convert()
+            self._draw_bg(bg)
+            self.backgrounds[self.config.idx] = bg
+        return self.backgrounds[self.config.idx]
+
+    def _draw_bg(self, surface):      
         theme = self.config.theme
 
         for row in range(ROWS):
@@ -49,67 +64,111 @@ class Game:
                     # blit
                     surface.blit(lbl, lbl_pos)
 
-    def show_pieces(self, surface):
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece = self.board.squares[row][col].piece
-                if piece and piece is not self.dragger.piece:
-                    img = pygame.image.load(piece.texture).convert_alpha()
-                    img_rect = img.get_rect()
-                    img_rect.center = (col * SQSIZE + SQSIZE // 2, row * SQSIZE + SQSIZE // 2)
-                    surface.blit(img, img_rect)
-
-    def show_moves(self, surface):
-        theme = self.config.theme
-
-        if self.dragger.dragging: 
-            piece = self.dragger.piece
-
-            # loop all valid moves 
-            for move in piece.moves:
-                # color 
-                color = theme.moves.light if (move.final.row + move.final.col) % 2 == 0 else theme.moves.dark
-                # rect
-                rect = (move.final.col * SQSIZE, move.final.row * SQSIZE, SQSIZE, SQSIZE)
-                # blit
-                blit = pygame.draw.rect(surface, color, rect)
+    def show_thinking(self, surface):
+        if self.thinking:
+            surface.blit(self._thinking_label(), self._thinking_rect())
+
+    def _thinking_label(self):
+        return self.config.font.render(self.thinking, 1, (255, 255, 255), (0, 0, 0))
+
+    def _thinking_rect(self):
+        lbl = self._thinking_label()
+        return lbl.get_rect(topright=(WIDTH - 5, 5))
+
+    def set_thinking(self, thinking):
+        # dots cycle while the AI searches, so the window visibly stays alive
+        text = 'Thinking' + '.' * (pygame.time.get_ticks() // 400 % 4) if thinking else None
+        if text != self.thinking:
+            if self.thinking:
+                self.mark_rect(self._thinking_rect())
+            self.thinking = text
+            if text:
+                self.mark_rect(self._thinking_rect())
+
+    # Dirty rectangles
+
+    def draw(self, surface):
+        '''
+            Redraws the squares marked dirty since the last frame, and returns
+            the rects to update on the display (none when nothing changed)
+        '''
+        if not self.dirty:
+            return []
 
-    def show_last_move(self, surface):
         theme = self.config.theme
-
-        if self.board.last_move:
-            initial = self.board.last_move.initial 
-            final = self.board.last_move.final
-
-            for pos in [initial, final]:
-                # color 
-                color = theme.trace.light if (pos.row + pos.col) % 2 == 0 else theme.trace.dark 
-                # rect
-                rect = (pos.col * SQSIZE, pos.row * SQSIZE, SQSIZE, SQSIZE)
-                # blit
-                pygame.draw.rect(surface, color, rect)
-
-    def show_hover(self, surface):
-        if self.hovered_sqr:
-            # color
-            color = (180, 180, 180)
-            # rect
-            rect = (self.hovered_sqr.col * SQSIZE, self.hovered_sqr.row * SQSIZE, SQSIZE, SQSIZE)
-            # blit
-            pygame.draw.rect(surface, color, rect, width=3)
+        bg = self.background()
+        last = self.board.last_move
+        traces = {(last.initial.row, last.initial.col), (last.final.row, last.final.col)} if last else set()
+        targets = {(move.final.row, move.final.col) for move in self.dragger.moves} if self.dragger.dragging else set()
+        hovered = (self.hovered_sqr.row, self.hovered_sqr.col) if self.hovered_sqr else None
+
+        rects = []
+        for row, col in self.dirty:
+            rect = pygame.Rect(col * SQSIZE, row * SQSIZE, SQSIZE, SQSIZE)
+            light = (row + col) % 2 == 0
+            surface.blit(bg, rect, rect)
+            if (row, col) in traces:
+                pygame.draw.rect(surface, theme.trace.light if light else theme.trace.dark, rect)
+            if (row, col) in targets:
+                pygame.draw.rect(surface, theme.moves.light if light else theme.moves.dark, rect)
+            piece = self.board.squares[row][col].piece
+            if piece and piece is not self.dragger.piece:
+                img = textures.get(piece.color, piece.name)
+                surface.blit(img, img.get_rect(center=rect.center))
+            if (row, col) == hovered:
+                pygame.draw.rect(surface, (180, 180, 180), rect, width=3)
+            rects.append(rect)
+
+        # drawn over the squares, which were marked dirty where they cover them
+        self.show_thinking(surface)
+        if self.dragger.dragging:
+            self.dragger.update_blit(surface)
+
+        if len(self.dirty) == ROWS * COLS:
+            rects = [surface.get_rect()]
+        self.dirty.clear()
+        return rects
+
+    def mark_square(self, row, col):
+        if 0 <= row < ROWS and 0 <= col < COLS:
+            self.dirty.add((row, col))
+
+    def mark_rect(self, rect):
+        # every square the rect (in pixels) touches
+        if rect is None:
+            return
+        for row in range(max(rect.top // SQSIZE, 0), min((rect.bottom - 1) // SQSIZE, ROWS - 1) + 1):
+            for col in range(max(rect.left // SQSIZE, 0), min((rect.right - 1) // SQSIZE, COLS - 1) + 1):
+                self.dirty.add((row, col))
+
+    def mark_all(self):
+        self.dirty.update((row, col) for row in range(ROWS) for col in range(COLS))
+
+    def mark_drag(self):
+        # the squares a picked up piece changes: where it came from, its moves and the piece itself
+        dragger = self.dragger
+        if dragger.dragging:
+            self.mark_square(dragger.initial_row, dragger.initial_col)
+            for move in dragger.moves:
+                self.mark_square(move.final.row, move.final.col)
+            self.mark_rect(dragger.rect())
 
     # other methods
     def next_turn(self):
         self.next_player = 'white' if self.next_player == 'black' else 'black'
 
     def set_hover(self, row, col):
+        if self.hovered_sqr:
+            self.mark_square(self.hovered_sqr.row, self.hovered_sqr.col)
         if 0 <= row < 8 and 0 <= col < 8:
             self.hovered_sqr = self.board.squares[row][col]
+            self.mark_square(row, col)
         else:
             self.hovered_sqr = None  # Or any other suitable default action
 
     def change_theme(self):
         self.config.change_theme()
+        self.mark_all()
 
     def play_sound(self, captured=False):
         if captured:
@@ -2,91 +2,58 @@ import pygame
 import sys
 
 from const import *
+from bitboard import WHITE, QUEEN
 from game import Game
+from textures import textures
 from square import Square 
 from move import Move 
+from transposition import TranspositionTable
+from worker import SearchJob
+from parallel import SearchPool
 
-
-def minimax(board, depth, maximizingPlayer):
-    if depth == 0 or board.is_game_over():
-        return board.evaluate()
-
-    if maximizingPlayer:
-        maxEval = float('-inf')
-        for move in board.get_all_possible_moves('black'):
-            # Get the piece associated with the move
-            piece = board.squares[move.initial.row][move.initial.col].piece
-            # Check if the move is valid
-            if piece and board.valid_move(piece, move):
-                board.move_piece(move)
-                evaluation = minimax(board, depth - 1, False)
-                board.undo_move()
-                maxEval = max(maxEval, evaluation)
-        return maxEval
-    else:
-        minEval = float('inf')
-        for move in board.get_all_possible_moves('white'):
-            # Get the piece associated with the move
-            piece = board.squares[move.initial.row][move.initial.col].piece
-            # Check if the move is valid
-            if piece and board.valid_move(piece, move):
-                board.move_piece(move)
-                evaluation = minimax(board, depth - 1, True)
-                board.undo_move()
-                minEval = min(minEval, evaluation)
-        return minEval
+# posted by the AI's search thread when it has a move, to wake up the main loop
+AI_DONE = pygame.event.custom_type()
 
 class Main:
     def __init__(self):
         pygame.init()
         self.screen = pygame.display.set_mode((680, 680))
         pygame.display.set_caption('Chess')
+        # decode every piece image once, now that the display mode is set
+        textures.load()
         self.game = Game()
+        self.tt = TranspositionTable(AI_HASH_SIZE)
+        # worker processes for the AI, if it searches on more than one core
+        self.pool = SearchPool(AI_WORKERS, AI_HASH_SIZE) if AI_WORKERS > 1 else None
+        # the AI's search while it is thinking, it runs in the background
+        self.ai_job = None
+        # search of the position after the reply the AI expects, run on the player's time
+        self.ponder_job = None
+        self.ponder_move = None
 
 
     def mainloop(self):
         board = self.game.board
         dragger = self.game.dragger 
+        clock = pygame.time.Clock()
 
         while True:
             # Render the game state
             self.render(dragger)
 
-            for event in pygame.event.get():
+            for event in self.wait_events(dragger, clock):
                 if event.type == pygame.MOUSEBUTTONDOWN:
                     dragger.update_mouse(event.pos)
                     clicked_row = dragger.mouseY // SQSIZE
                     clicked_col = dragger.mouseX // SQSIZE
                     if board.squares[clicked_row][clicked_col].has_piece():
                         piece = board.squares[clicked_row][clicked_col].piece
-                        # valid piece (color) ?
-                        if piece.color == self.game.next_player:
-                            board.calc_moves(piece, clicked_row, clicked_col, bool=True)
+                        # the player's own piece, and not while the AI thinks
+                        if piece.color == self.game.next_player == 'white' and self.ai_job is None:
+                            moves = board.calc_moves(piece, clicked_row, clicked_col, bool=True)
                             dragger.save_initial(event.pos)
-                            dragger.drag_piece(piece)
-                            # show methods 
-                            self.game.show_bg(self.screen)
-                            self.game.show_last_move(self.screen)
-                            self.game.show_moves(self.screen)
-                            self.game.show_pieces(self.screen)
-
-                        if self.game.next_player == 'black':
-                            best_move = None
-                            best_score = float('-inf')
-                            for move in board.get_all_possible_moves('black'):
-                                board.move_piece(move)
-                                score = minimax(board, 0, False) # where you can change the depth of the minimax algorithm 
-                                board.undo_move(move)
-
-                                if score > best_score:
-                                    best_score = score
-                                    best_move = move
-
-                            if best_move:
-                                board.move_piece(best_move)
-                                board.last_move = best_move  # Update last move
-                                # Switch to the next player
-                                self.game.next_turn()
+                            dragger.drag_piece(piece, moves)
+                            self.game.mark_drag()
 
                 elif event.type == pygame.MOUSEMOTION:
                     motion_row = event.pos[1] // SQSIZE
@@ -95,17 +62,14 @@ class Main:
                     self.game.set_hover(motion_row, motion_col)
 
                     if dragger.dragging:
+                        # redraw where the piece was and where it is now
+                        self.game.mark_rect(dragger.rect())
                         dragger.update_mouse(event.pos)
-                        # show methods
-                        self.game.show_bg(self.screen)
-                        self.game.show_last_move(self.screen)
-                        self.game.show_moves(self.screen)
-                        self.game.show_pieces(self.screen)
-                        self.game.show_hover(self.screen)
-                        dragger.update_blit(self.screen)
+                        self.game.mark_rect(dragger.rect())
 
                 elif event.type == pygame.MOUSEBUTTONUP:                   
                     if dragger.dragging:
+                        self.game.mark_drag()
                         dragger.update_mouse(event.pos)
 
                         released_row = dragger.mouseY // SQSIZE
@@ -122,14 +86,10 @@ class Main:
                             captured = board.squares[released_row][released_col].has_piece()
                             board.move(dragger.piece, move)
 
-                            board.set_true_en_passant(dragger.piece)
-
                             # sounds
                             self.game.play_sound(captured)
-                            # show methods 
-                            self.game.show_bg(self.screen)
-                            self.game.show_last_move(self.screen) 
-                            self.game.show_pieces(self.screen)
+                            # castling and en passant move more than two squares
+                            self.game.mark_all()
                             # next turn
                             self.game.next_turn()
                                        
@@ -144,53 +104,120 @@ class Main:
 
                     # restart
                     if event.key == pygame.K_r:
+                        self.cancel_ai()
                         self.game.reset()
                         game = self.game
                         board = self.game.board
                         dragger = self.game.dragger 
 
+                # the window was uncovered
+                elif event.type == pygame.WINDOWEXPOSED:
+                    self.game.mark_all()
+
                 elif event.type == pygame.QUIT:
+                    self.cancel_ai()
+                    if self.pool is not None:
+                        self.pool.close()
                     pygame.quit()
                     sys.exit()
 
             # AI's turn to move
             self.execute_ai_turn()
 
+    def wait_events(self, dragger, clock):
+        '''
+            Blocks until something happens: input, or the AI finding its move. While
+            the AI thinks it also wakes up to animate the label, and while a piece is
+            dragged it polls at up to FPS frames a second
+        '''
+        if dragger.dragging:
+            clock.tick(FPS)
+            return pygame.event.get()
+        if self.ai_job is not None:
+            event = pygame.event.wait(THINKING_FRAME)
+        else:
+            event = pygame.event.wait()
+        return [event] + pygame.event.get()
+
     def execute_ai_turn(self):
-        if self.game.next_player == 'black':
-            best_move = None
-            best_score = float('-inf')
-            for move in self.game.board.get_all_possible_moves('black'):
-                # Get the piece associated with the move
-                piece = self.game.board.squares[move.initial.row][move.initial.col].piece
-
-                # Check if the move is valid
-                if piece and self.game.board.valid_move(piece, move):
-                    self.game.board.move_piece(move)
-                    score = minimax(self.game.board, 0, False)  # Adjust depth as needed
-                    self.game.board.undo_move()
-
-                    if score > best_score:
-                        best_score = score
-                        best_move = move
-
-            if best_move:
-                self.game.board.move_piece(best_move)
-                self.game.board.last_move = best_move
-                self.game.next_turn()
+        if self.game.next_player != 'black':
+            return
+
+        # the reply the AI pondered on was played: its search goes on as the real one
+        if self.ai_job is None and self.ponder_job is not None:
+            if self.ponder_hit(self.game.board.last_move):
+                self.ai_job = self.ponder_job
+                self.ai_job.on_done = self.post_ai_done
+                self.ai_job.search.limit_time(AI_TIME_LIMIT)
+                self.ponder_job = None
+            else:
+                self.cancel_ponder()
+
+        # start thinking, the board keeps drawing and taking events meanwhile
+        if self.ai_job is None:
+            if self.pool is not None:
+                self.ai_job = SearchJob(self.game.board, 'black', pool=self.pool, on_done=self.post_ai_done,
+                                        max_depth=AI_MAX_DEPTH, time_limit=AI_TIME_LIMIT)
+            else:
+                self.ai_job = SearchJob(self.game.board, 'black', on_done=self.post_ai_done,
+                                        max_depth=AI_MAX_DEPTH, time_limit=AI_TIME_LIMIT, tt=self.tt)
+            return
+
+        if not self.ai_job.done():
+            return
+
+        job, self.ai_job = self.ai_job, None
+        result = job.result
+        # a result for another position is dropped, the AI thinks again on the next pass
+        if result and job.key == self.game.board.hash and self.game.board.move_piece(result.move):
+            self.game.mark_all()
+            self.game.next_turn()
+            self.start_ponder(result)
+
+    def post_ai_done(self, job):
+        pygame.event.post(pygame.event.Event(AI_DONE))
+
+    def start_ponder(self, result):
+        # pondering needs a search whose time limit can be set once it runs, so not the process pool
+        if not AI_PONDER or self.pool is not None or len(result.pv) < 2:
+            return
+        board = self.game.board.copy()
+        # the principal variation can end in a move from the transposition table, check it
+        move = board.encode(result.pv[1])
+        if move not in board.generate_moves(WHITE):
+            return
+        board.make_move(move)
+        self.ponder_job = SearchJob(board, 'black', max_depth=AI_MAX_DEPTH, time_limit=AI_PONDER_TIME_LIMIT, tt=self.tt)
+        self.ponder_move = result.pv[1]
+
+    def ponder_hit(self, move):
+        # the player always promotes to a queen
+        predicted = self.ponder_move
+        return (move is not None and move.initial == predicted.initial and move.final == predicted.final
+                and predicted.promotion in (None, QUEEN))
+
+    def cancel_ponder(self):
+        if self.ponder_job is not None:
+            # the next search shares the transposition table, so let this one finish first
+            self.ponder_job.cancel()
+            self.ponder_job.wait()
+            self.ponder_job = None
+            self.ponder_move = None
+
+    def cancel_ai(self):
+        self.cancel_ponder()
+        if self.ai_job is not None:
+            # like a ponder search, it shares the transposition table with the next one
+            self.ai_job.cancel()
+            self.ai_job.wait()
+            self.ai_job = None
 
     def render(self, dragger):
-        self.game.show_bg(self.screen)
-        self.game.show_last_move(self.screen)
-        self.game.show_moves(self.screen)
-        self.game.show_pieces(self.screen)
-        self.game.show_hover(self.screen)
-
-        if dragger.dragging: 
-                dragger.update_blit(self.screen)
-
-
-        pygame.display.update()
+        # only the squares that changed are drawn and sent to the display, nothing when idle
+        self.game.set_thinking(self.ai_job is not None)
+        rects = self.game.draw(self.screen)
+        if rects:
+            pygame.display.update(rects)
 
 if __name__ == "__main__":
     main = Main()
@@ -1,10 +1,50 @@
 
+# Moves inside the engine are ints: bits 0-5 hold the initial square, bits 6-11
+# the final square and bits 12-14 the kind a pawn promotes to (0 for none).
+
+def encode_move(initial, final, promotion=0):
+    # a square past either end would spill into the neighbouring fields
+    if not (0 <= initial < 64 and 0 <= final < 64):
+        raise ValueError(f'square off the board: {initial}, {final}')
+    return initial | final << 6 | promotion << 12
+
+# promotion letters by kind, as in e7e8q
+PROMOTION_LETTERS = ' nbrq'
+
+def move_name(move):
+    '''
+        Coordinate notation of an encoded move: e2e4, e7e8q
+    '''
+    name = ''
+    for sq in (move & 63, move >> 6 & 63):
+        name += 'abcdefgh'[sq & 7] + str(8 - (sq >> 3))
+    return name + PROMOTION_LETTERS[move >> 12].strip()
+
+def parse_move(name):
+    '''
+        The encoded move of a name in coordinate notation. Raises ValueError if it is not one
+    '''
+    if len(name) not in (4, 5) or name[0] not in 'abcdefgh' or name[2] not in 'abcdefgh' \
+            or name[1] not in '12345678' or name[3] not in '12345678':
+        raise ValueError(f'not a move: {name}')
+    promotion = 0
+    if len(name) == 5:
+        if name[4] not in 'nbrq':
+            raise ValueError(f'not a move: {name}')
+        promotion = PROMOTION_LETTERS.index(name[4])
+    initial = (8 - int(name[1])) * 8 + 'abcdefgh'.index(name[0])
+    final = (8 - int(name[3])) * 8 + 'abcdefgh'.index(name[2])
+    return encode_move(initial, final, promotion)
+
 class Move:
 
-    def __init__(self, initial, final):
-        # initial and final are squares
+    __slots__ = ('initial', 'final', 'promotion')
+
+    def __init__(self, initial, final, promotion=None):
+        # initial and final are squares, promotion is the kind a pawn promotes to
         self.initial = initial
         self.final = final 
+        self.promotion = promotion
 
     def __str__(self):
         s = ''
@@ -13,4 +53,7 @@ class Move:
         return s
     
     def __eq__(self, other):
-        return self.initial == other.initial and self.final == other.final
\ No newline at end of file
+        return self.initial == other.initial and self.final == other.final and self.promotion == other.promotion
+
+    def __hash__(self):
+        return hash((self.initial.row, self.initial.col, self.final.row, self.final.col, self.promotion))
@@ -0,0 +1,86 @@
+from bitboard import *
+
+MAX_PLY = 128
+
+# sort keys, from the first move tried to the last
+TT_MOVE = 1 << 30
+CAPTURE = 1 << 24
+KILLER = 1 << 20
+HISTORY_LIMIT = KILLER - 1
+
+class MoveOrdering:
+    '''
+        Orders moves for the search: the transposition table move, then captures and
+        promotions by MVV-LVA, then the killer moves of the ply, then quiet moves by
+        their history score
+    '''
+
+    def __init__(self):
+        # two quiet moves per ply that caused a beta cutoff
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        # how often a quiet move caused a cutoff, indexed by color and the move's initial and final square
+        self.history = [[0] * 4096 for _ in (WHITE, BLACK)]
+
+    def order(self, board, moves, c, ply, tt_move=None):
+        mailbox = board.mailbox
+        en_passant = board.en_passant
+        killers = self.killers[ply] if ply < MAX_PLY else (None, None)
+        history = self.history[c]
+
+        def key(move):
+            if move == tt_move:
+                return TT_MOVE
+            initial, final = move & 63, move >> 6 & 63
+            kind = mailbox[initial][1]
+            victim = mailbox[final]
+            # most valuable victim first, least valuable attacker breaks ties
+            # (kinds are numbered in order of value), better promotions first
+            if victim:
+                return CAPTURE + victim[1] * 8 - kind + (move >> 12)
+            if kind == PAWN:
+                if final == en_passant:
+                    return CAPTURE
+                if move >> 12:
+                    return CAPTURE + (move >> 12) * 8
+            if move == killers[0]:
+                return KILLER + 1
+            if move == killers[1]:
+                return KILLER
+            return history[move & 4095]
+
+        moves.sort(key=key, reverse=True)
+        return moves
+
+    def moves(self, board, c, ply, tt_move=None, captures_only=False):
+        '''
+            Yields the pseudo-legal moves of a node in the same order. The transposition
+            table move comes out before anything else is generated, so a cutoff on it
+            skips move generation altogether. Legality is left to the caller
+        '''
+        if tt_move is not None and board.is_pseudo_legal(tt_move, c):
+            yield tt_move
+        moves = [move for move in board.pseudo_moves(c, captures_only) if move != tt_move]
+        yield from self.order(board, moves, c, ply)
+
+    def is_quiet(self, board, move):
+        final = move >> 6 & 63
+        if board.mailbox[final] or move >> 12:
+            return False
+        return board.mailbox[move & 63][1] != PAWN or final != board.en_passant
+
+    def cutoff(self, move, c, ply, depth):
+        '''
+            Record a quiet move that caused a beta cutoff
+        '''
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+
+        history = self.history[c]
+        history[move & 4095] += depth * depth
+        # keep history scores below the killers
+        if history[move & 4095] > HISTORY_LIMIT:
+            for scores in self.history:
+                scores[:] = [score // 2 for score in scores]
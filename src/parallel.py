@@ -0,0 +1,132 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from bitboard import *
+from board import Board
+from ordering import MoveOrdering
+from search import Search, SearchResult, MATE
+from transposition import TranspositionTable
+
+# state of a worker process, set up once when the pool starts it. The game
+# server's pool runs the same way
+_stop_event = None
+_tt = None
+
+def init_worker(stop_event, hash_size):
+    global _stop_event, _tt
+    _stop_event = stop_event
+    _tt = TranspositionTable(hash_size)
+
+def worker_search(fen, max_depth, time_limit=None, node_limit=None, info=None, min_depth=0):
+    '''
+        In a worker process: a Search of a FEN position with the worker's table and
+        stop event. Returns the board, the color to move and the Search
+    '''
+    board = Board()
+    player_color = board.set_fen(fen)
+    return board, player_color, Search(board, max_depth, time_limit, node_limit, _tt, info=info, stop_event=_stop_event,
+                                       min_depth=min_depth)
+
+def _search_moves(fen, moves, max_depth, time_limit, node_limit):
+    '''
+        Runs in a worker process: iterative deepening over some of the root moves.
+        Returns the SearchResult of every depth it finished and the nodes it searched
+    '''
+    iterations = []
+    # depth 1 is always finished, so every root move gets a score to compare
+    _, player_color, search = worker_search(fen, max_depth, time_limit, node_limit, iterations.append, min_depth=1)
+    search.search(player_color, moves)
+    return iterations, search.nodes
+
+class SearchPool:
+    '''
+        Worker processes for ParallelSearch. Each keeps a transposition table of
+        hash_size MB between searches. Runs one search at a time
+    '''
+
+    def __init__(self, workers=None, hash_size=16):
+        self.workers = workers or os.cpu_count() or 1
+        self.stop_event = multiprocessing.Event()
+        self.lock = threading.Lock()
+        self.executor = ProcessPoolExecutor(self.workers, initializer=init_worker, initargs=(self.stop_event, hash_size))
+
+    def close(self):
+        self.stop_event.set()
+        self.executor.shutdown()
+
+class ParallelSearch:
+    '''
+        Splits the root moves across the processes of a SearchPool, so the search
+        uses more than one core. Positions go to the workers as FEN strings and the
+        moves as ints. Each worker deepens its own share, the result is the best
+        move at the deepest depth every share still in play finished
+    '''
+
+    def __init__(self, board, pool, max_depth=64, time_limit=None, node_limit=None):
+        self.board = board
+        self.pool = pool
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.nodes = 0
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+        self.pool.stop_event.set()
+
+    def search(self, player_color):
+        c = COLOR_INDEX[player_color]
+        board = self.board
+        start = time.time()
+
+        moves = board.generate_moves(c)
+        if not moves:
+            return None
+        # deal the ordered moves out in turn, so every worker gets some of the likely good ones
+        MoveOrdering().order(board, moves, c, 0)
+        workers = self.pool.workers
+        shares = [moves[i::workers] for i in range(workers) if moves[i::workers]]
+        node_limit = self.node_limit // len(shares) if self.node_limit is not None else None
+        fen = board.fen(player_color)
+
+        with self.pool.lock:
+            self.pool.stop_event.clear()
+            # stop() may have come in while an earlier search held the pool
+            if self.stopped:
+                self.pool.stop_event.set()
+            futures = [self.pool.executor.submit(_search_moves, fen, share, self.max_depth, self.time_limit, node_limit)
+                       for share in shares]
+            results = []
+            for future in as_completed(futures):
+                iterations, nodes = future.result()
+                results.append((iterations, nodes))
+                # a forced mate for one share settles it, the other workers can stop
+                if iterations and iterations[-1].score >= MATE - self.max_depth:
+                    self.pool.stop_event.set()
+
+        self.nodes = sum(nodes for _, nodes in results)
+        mates = [iterations[-1] for iterations, _ in results if iterations and iterations[-1].score >= MATE - self.max_depth]
+        if mates:
+            best = max(mates, key=lambda result: result.score)
+            return SearchResult(best.move, best.score, best.pv, best.depth, self.nodes, time.time() - start)
+
+        # otherwise scores are only comparable between shares searched to the same depth. Every
+        # share finishes depth 1 unless the search is stopped, one stopped before has nothing to
+        # offer. A share that is mated stops deepening but loses at any depth, it does not hold
+        # back the depth the others are compared at
+        finished = [iterations for iterations, _ in results if iterations]
+        if not finished:
+            move = board.to_move(moves[0])
+            return SearchResult(move, 0, [move], 0, self.nodes, time.time() - start)
+        alive = [iterations for iterations in finished if iterations[-1].score > -(MATE - self.max_depth)]
+        if not alive:
+            # every move is mated, the longest mate is the best defence
+            best = max((iterations[-1] for iterations in finished), key=lambda result: result.score)
+            return SearchResult(best.move, best.score, best.pv, best.depth, self.nodes, time.time() - start)
+        depth = min(len(iterations) for iterations in alive)
+        best = max((iterations[depth - 1] for iterations in alive), key=lambda result: result.score)
+        return SearchResult(best.move, best.score, best.pv, depth, self.nodes, time.time() - start)
@@ -0,0 +1,126 @@
+import argparse
+import sys
+import time
+
+from bitboard import *
+from board import Board, START_FEN
+from move import move_name
+
+# Perft (performance test) counts the leaf nodes of the legal move tree to a
+# fixed depth. The counts of these positions are well known, so a mismatch
+# points at a move generation bug, and the time taken gives the speed of the
+# generator. Each entry holds the counts for depth 1, 2, 3, ... and the depth
+# the suite runs it to by default.
+POSITIONS = [
+    ('startpos', START_FEN,
+     [20, 400, 8902, 197281, 4865609], 4),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     [48, 2039, 97862, 4085603], 3),
+    ('position3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+     [14, 191, 2812, 43238, 674624], 4),
+    ('position4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+     [6, 264, 9467, 422333], 3),
+    ('position5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+     [44, 1486, 62379, 2103487], 3),
+    ('position6', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+     [46, 2079, 89890, 3894594], 3),
+]
+
+def perft(board, c, depth):
+    '''
+        Number of leaf nodes of the legal move tree of color index c to depth, through
+        the engine's pseudo-legal generator and try_move
+    '''
+    if depth == 1:
+        return len(board.generate_moves(c))
+    nodes = 0
+    for move in board.pseudo_moves(c):
+        undo = board.try_move(move)
+        if undo is None:
+            continue
+        nodes += perft(board, c ^ 1, depth - 1)
+        board.unmake_move(undo)
+    return nodes
+
+def perft_gui(board, player_color, depth):
+    '''
+        The same count through the Move object API the GUI uses
+    '''
+    moves = board.get_all_possible_moves(player_color)
+    if depth == 1:
+        return len(moves)
+    other = 'black' if player_color == 'white' else 'white'
+    nodes = 0
+    for move in moves:
+        board.move_piece(move)
+        nodes += perft_gui(board, other, depth - 1)
+        board.undo_move()
+    return nodes
+
+def divide(board, c, depth):
+    '''
+        Perft count below each legal move, for tracking down a wrong total
+    '''
+    counts = {}
+    for move in board.generate_moves(c):
+        undo = board.make_move(move)
+        counts[move] = perft(board, c ^ 1, depth - 1) if depth > 1 else 1
+        board.unmake_move(undo)
+    return counts
+
+def run(fen, depth, gui=False):
+    '''
+        Returns the perft count of a FEN position and the seconds it took
+    '''
+    board = Board()
+    player_color = board.set_fen(fen)
+    start = time.time()
+    if gui:
+        nodes = perft_gui(board, player_color, depth)
+    else:
+        nodes = perft(board, COLOR_INDEX[player_color], depth)
+    return nodes, time.time() - start
+
+def report(name, depth, nodes, elapsed, expected=None):
+    nps = int(nodes / elapsed) if elapsed > 0 else 0
+    line = f'{name:<10} depth {depth} nodes {nodes:>9} time {elapsed:7.2f}s nps {nps:>8}'
+    if expected is not None:
+        line += ' ok' if nodes == expected else f' FAIL (expected {expected})'
+    print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description='Count move generation leaf nodes (perft)')
+    parser.add_argument('--fen', help='position to count, instead of the reference suite')
+    parser.add_argument('--depth', type=int, help='depth to count to')
+    parser.add_argument('--divide', action='store_true', help='show the count below each move of the --fen position')
+    parser.add_argument('--gui', action='store_true', help='count through the Move object API of the GUI')
+    args = parser.parse_args()
+
+    if args.fen:
+        depth = args.depth or 3
+        if args.divide:
+            board = Board()
+            c = COLOR_INDEX[board.set_fen(args.fen)]
+            counts = divide(board, c, depth)
+            for move in sorted(counts, key=move_name):
+                print(f'{move_name(move)}: {counts[move]}')
+            print(f'total {sum(counts.values())}')
+            return 0
+        nodes, elapsed = run(args.fen, depth, args.gui)
+        report('fen', depth, nodes, elapsed)
+        return 0
+
+    failed = 0
+    total_nodes = total_time = 0
+    for name, fen, counts, default_depth in POSITIONS:
+        depth = min(args.depth or default_depth, len(counts))
+        nodes, elapsed = run(fen, depth, args.gui)
+        report(name, depth, nodes, elapsed, counts[depth - 1])
+        failed += nodes != counts[depth - 1]
+        total_nodes += nodes
+        total_time += elapsed
+    report('total', '-', total_nodes, total_time)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,8 @@
 import os
 
+def texture_path(color, name, size=80):
+    return os.path.join('assets', 'images', f'imgs-{size}px', f'{color}_{name}.png')
+
 class Piece:
 
     def __init__(self, name, color, value, texture=None, texture_rect=None):
@@ -7,22 +10,14 @@ class Piece:
         self.color = color
         value_sign = 1 if color == 'white' else -1
         self.value = value * value_sign
-        self.moves = []
         self.moved = False
         self.texture = texture 
         self.set_texture()
         self.texture_rect = texture_rect 
 
     def set_texture(self, size=80):
-        self.texture = os.path.join(
-            'assets', 'images', f'imgs-{size}px', f'{self.color}_{self.name}.png') 
+        self.texture = texture_path(self.color, self.name, size)
     
-    def add_move(self, move):
-        self.moves.append(move)
-
-    def clear_moves(self):
-        self.moves = []
-
 class Pawn(Piece):
     def __init__(self, color):
         super().__init__('pawn', color, 1.0)
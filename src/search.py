@@ -0,0 +1,275 @@
+import threading
+import time
+
+from bitboard import *
+from zobrist import SIDE_KEY
+from transposition import *
+from ordering import MoveOrdering
+from evaluation import PIECE_VALUES
+
+INFINITY = 1000000
+MATE = 100000
+
+# scores this close to MATE are mates, stored in the transposition table
+# relative to the node instead of the root
+MATE_BOUND = MATE - 1000
+
+# quiescence search skips captures that leave it this far below alpha even after winning the piece
+DELTA_MARGIN = 200
+
+class SearchTimeout(Exception):
+    pass
+
+class SearchResult:
+
+    def __init__(self, move, score, pv, depth, nodes, elapsed):
+        # move and pv hold Move objects, score is from the searching side's point of view
+        self.move = move
+        self.score = score
+        self.pv = pv
+        self.depth = depth
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    def __str__(self):
+        return f'depth {self.depth} score {self.score} nodes {self.nodes} pv ' + ' '.join(str(move) for move in self.pv)
+
+class Search:
+    '''
+        Iterative deepening alpha-beta (negamax) search. Stops at max_depth, or once
+        time_limit seconds or node_limit nodes are spent, and keeps the result of
+        the last depth it finished. info, if given, is called with the SearchResult
+        of every finished depth. stop_event lets another thread or process stop it.
+        The time and node limits only apply once min_depth is finished
+    '''
+
+    def __init__(self, board, max_depth=64, time_limit=None, node_limit=None, tt=None, info=None, stop_event=None,
+                 min_depth=0):
+        self.board = board
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.tt = tt if tt is not None else TranspositionTable()
+        self.info = info
+        self.ordering = MoveOrdering()
+        self.nodes = 0
+        self.start = None
+        self.deadline = None
+        self.min_depth = min_depth
+        # depth of the iteration running
+        self.depth = 0
+        self.stop_event = stop_event if stop_event is not None else threading.Event()
+
+    def stop(self):
+        '''
+            Ask a running search to stop, from another thread. It returns the result
+            of the last depth it finished
+        '''
+        self.stop_event.set()
+
+    def limit_time(self, time_limit):
+        '''
+            Set the time limit of a running search, counted from when it started. Turns
+            a ponder search, started with a longer one, into the search for the move
+        '''
+        self.time_limit = time_limit
+        self.deadline = self.start + time_limit
+
+    def search(self, player_color, moves=None):
+        '''
+            Searches the position for color player_color. moves limits the search
+            to some of the legal moves, encoded as ints
+        '''
+        c = COLOR_INDEX[player_color]
+        board = self.board
+        start = self.start = time.time()
+        self.nodes = 0
+        self.deadline = start + self.time_limit if self.time_limit is not None else None
+        self.tt.new_search()
+
+        root_moves = list(moves) if moves is not None else board.generate_moves(c)
+        if not root_moves:
+            return None
+        entry = self.tt.probe(self._key(c))
+        self.ordering.order(board, root_moves, c, 0, entry[3] if entry else None)
+
+        best, score, pv, depth = root_moves[0], 0, [root_moves[0]], 0
+        for d in range(1, self.max_depth + 1):
+            self.depth = d
+            try:
+                score, pv = self._root(root_moves, d, c)
+            except SearchTimeout:
+                break
+            best, depth = pv[0], d
+            if self.info is not None:
+                self.info(self._result(pv, score, depth, start))
+
+            # try the best move first at the next depth
+            root_moves.remove(best)
+            root_moves.insert(0, best)
+
+            # no need to look deeper once a forced mate is found
+            if abs(score) >= MATE - self.max_depth:
+                break
+
+        return self._result(pv, score, depth, start)
+
+    def _result(self, pv, score, depth, start):
+        board = self.board
+        return SearchResult(board.to_move(pv[0]), score, [board.to_move(move) for move in pv],
+                            depth, self.nodes, time.time() - start)
+
+    def _root(self, moves, depth, c):
+        board = self.board
+        alpha, beta = -INFINITY, INFINITY
+        pv = []
+        for move in moves:
+            undo = board.make_move(move)
+            try:
+                score, child_pv = self._alphabeta(depth - 1, -beta, -alpha, c ^ 1, 1)
+            finally:
+                board.unmake_move(undo)
+            score = -score
+            if score > alpha:
+                alpha = score
+                pv = [move] + child_pv
+        self.tt.store(self._key(c), depth, EXACT, alpha, pv[0])
+        return alpha, pv
+
+    def _alphabeta(self, depth, alpha, beta, c, ply):
+        '''
+            Returns the score of the position for color index c and its principal variation
+        '''
+        board = self.board
+        self.nodes += 1
+        if not self.nodes & 1023:
+            self._check_limits()
+
+        if depth == 0:
+            return self._quiesce(alpha, beta, c, ply)
+
+        # transposition table
+        key = self._key(c)
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry:
+            tt_depth, bound, score, tt_move = entry
+            if tt_depth >= depth:
+                score = self._from_tt(score, ply)
+                if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+                    return score, [tt_move] if tt_move else []
+
+        alpha_orig = alpha
+        best, best_move, pv = -INFINITY, None, []
+        legal = 0
+        for move in self.ordering.moves(board, c, ply, tt_move):
+            undo = board.try_move(move)
+            if undo is None:
+                continue
+            legal += 1
+            try:
+                score, child_pv = self._alphabeta(depth - 1, -beta, -alpha, c ^ 1, ply + 1)
+            finally:
+                board.unmake_move(undo)
+            score = -score
+            if score > best:
+                best, best_move = score, move
+                if score > alpha:
+                    alpha = score
+                    pv = [best_move] + child_pv
+                    if score >= beta:
+                        if self.ordering.is_quiet(board, best_move):
+                            self.ordering.cutoff(best_move, c, ply, depth)
+                        break
+
+        # checkmate or stalemate
+        if not legal:
+            return (-MATE + ply if board.is_in_check(COLORS[c]) else 0), []
+
+        if best >= beta:
+            self.tt.store(key, depth, LOWER, self._to_tt(best, ply), best_move)
+        elif best > alpha_orig:
+            self.tt.store(key, depth, EXACT, self._to_tt(best, ply), best_move)
+        else:
+            self.tt.store(key, depth, UPPER, self._to_tt(best, ply), None)
+        return best, pv
+
+    def _quiesce(self, alpha, beta, c, ply):
+        '''
+            Searches captures and promotions only, until the position is quiet
+        '''
+        board = self.board
+        self.nodes += 1
+        if not self.nodes & 1023:
+            self._check_limits()
+
+        # in check every evasion has to be searched, standing pat is not an option
+        in_check = board.is_in_check(COLORS[c])
+        if in_check:
+            best = stand_pat = -INFINITY
+        else:
+            # stand pat: the side to move can decline every capture
+            stand_pat = board.evaluate(COLORS[c])
+            if stand_pat >= beta:
+                return stand_pat, []
+            alpha = max(alpha, stand_pat)
+            best = stand_pat
+
+        mailbox = board.mailbox
+        pv = []
+        legal = 0
+        for move in self.ordering.moves(board, c, ply, captures_only=not in_check):
+            # delta pruning, promotions excepted
+            victim = mailbox[move >> 6 & 63]
+            if victim and not in_check and stand_pat + PIECE_VALUES[victim[1]] + DELTA_MARGIN <= alpha:
+                if not move >> 12:
+                    continue
+
+            undo = board.try_move(move)
+            if undo is None:
+                continue
+            legal += 1
+            try:
+                score, child_pv = self._quiesce(-beta, -alpha, c ^ 1, ply + 1)
+            finally:
+                board.unmake_move(undo)
+            score = -score
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    pv = [move] + child_pv
+                    if score >= beta:
+                        break
+
+        # checkmate
+        if in_check and not legal:
+            return -MATE + ply, []
+        return best, pv
+
+    def _key(self, c):
+        return self.board.hash ^ SIDE_KEY if c == BLACK else self.board.hash
+
+    def _to_tt(self, score, ply):
+        if score >= MATE_BOUND:
+            return score + ply
+        if score <= -MATE_BOUND:
+            return score - ply
+        return score
+
+    def _from_tt(self, score, ply):
+        if score >= MATE_BOUND:
+            return score - ply
+        if score <= -MATE_BOUND:
+            return score + ply
+        return score
+
+    def _check_limits(self):
+        if self.stop_event.is_set():
+            raise SearchTimeout()
+        if self.depth <= self.min_depth:
+            return
+        if self.deadline is not None and time.time() >= self.deadline:
+            raise SearchTimeout()
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchTimeout()
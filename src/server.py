@@ -0,0 +1,223 @@
+import argparse
+import asyncio
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from const import AI_MAX_DEPTH, AI_TIME_LIMIT, AI_HASH_SIZE
+from bitboard import *
+from board import Board, START_FEN
+from move import move_name, parse_move
+from parallel import init_worker, worker_search
+
+# Headless game server: many games at once, played over a line-based text
+# protocol on a local TCP socket, with no pygame. One asyncio loop handles
+# every connection. The AI moves are searched by a shared pool of worker
+# processes, one search per worker at a time, in the order the games asked.
+#
+#   new [white|black] [fen]   start a game, the player takes the given side
+#                             (white by default) -> game <id>, or error bad fen.
+#                             Castling rights and an en passant square the pieces
+#                             do not allow are dropped, fen <id> shows what is kept
+#   move <id> <move>          play a move in coordinate notation (e2e4, e7e8q)
+#                             -> ok, then later: move <id> <reply>
+#   fen <id>                  -> fen <id> <fen>
+#   close <id>                -> ok
+#   quit                      close the connection and its games
+#
+# Errors come back as: error <message>. A finished game sends result <id> 1-0, 0-1 or 1/2-1/2.
+
+PORT = 8765
+
+def _think(fen, max_depth, time_limit):
+    '''
+        Runs in a worker process: searches a position and returns the name of the best move
+    '''
+    board, player_color, search = worker_search(fen, max_depth, time_limit)
+    result = search.search(player_color)
+    return move_name(board.encode(result.move)) if result else None
+
+class ServerGame:
+    '''
+        One game on the server: its board, the side to move and the side the AI plays
+    '''
+
+    def __init__(self, id, writer, player='white', fen=START_FEN):
+        self.id = id
+        self.writer = writer
+        self.board = Board()
+        self.turn = self.board.set_fen(fen)
+        self.ai = 'black' if player == 'white' else 'white'
+        self.closed = False
+
+    def play(self, name):
+        '''
+            Play a move given in coordinate notation. Raises ValueError if it is not legal
+        '''
+        move = parse_move(name)
+        if move not in self.board.generate_moves(COLOR_INDEX[self.turn]):
+            raise ValueError(f'illegal move: {name}')
+        self.board.make_move(move)
+        self.turn = 'black' if self.turn == 'white' else 'white'
+
+    def result(self):
+        # None while the game goes on
+        if self.board.is_checkmate(self.turn):
+            return '0-1' if self.turn == 'white' else '1-0'
+        if self.board.is_stalemate(self.turn):
+            return '1/2-1/2'
+        return None
+
+class GameServer:
+    '''
+        Serves games to any number of connections from one asyncio loop, and
+        searches their AI moves in a shared pool of worker processes
+    '''
+
+    def __init__(self, workers=None, hash_size=AI_HASH_SIZE, max_depth=AI_MAX_DEPTH, time_limit=AI_TIME_LIMIT):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        # set on shutdown, so searches still running end at once
+        self.stop_event = multiprocessing.Event()
+        self.executor = ProcessPoolExecutor(self.workers, initializer=init_worker, initargs=(self.stop_event, hash_size))
+        self.games = {}
+        self.ids = itertools.count(1)
+        # games waiting for the AI to move, each at most once, served first come first served
+        self.queue = None
+
+    async def serve(self, host='127.0.0.1', port=PORT):
+        self.queue = asyncio.Queue()
+        # as many dispatchers as workers: a game waits for a free worker, never for a busy one
+        dispatchers = [asyncio.ensure_future(self._dispatch()) for _ in range(self.workers)]
+        server = await asyncio.start_server(self._client, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for dispatcher in dispatchers:
+                dispatcher.cancel()
+            self.stop_event.set()
+            self.executor.shutdown(wait=False)
+
+    async def _client(self, reader, writer):
+        games = []
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                words = line.decode().split()
+                if words == ['quit']:
+                    break
+                if words:
+                    self.command(words, writer, games)
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for game in games:
+                self._close(game)
+            writer.close()
+
+    def command(self, words, writer, games):
+        '''
+            Carries out one command, writing its reply and then anything that follows from it
+        '''
+        name, args = words[0], words[1:]
+        if name == 'new':
+            player = 'white'
+            if args and args[0] in ('white', 'black'):
+                player, args = args[0], args[1:]
+            try:
+                game = ServerGame(next(self.ids), writer, player, ' '.join(args) or START_FEN)
+            except ValueError:
+                self._send(writer, 'error bad fen')
+                return
+            self.games[game.id] = game
+            games.append(game)
+            self._send(writer, f'game {game.id}')
+            self._next(game)
+            return
+
+        if name not in ('move', 'fen', 'close'):
+            self._send(writer, f'error unknown command: {name}')
+            return
+        game = self.games.get(int(args[0])) if args and args[0].isdigit() else None
+        if game is None or game.writer is not writer:
+            self._send(writer, 'error no such game')
+            return
+
+        if name == 'fen':
+            self._send(writer, f'fen {game.id} {game.board.fen(game.turn)}')
+        elif name == 'close':
+            self._close(game)
+            games.remove(game)
+            self._send(writer, 'ok')
+        elif len(args) < 2:
+            self._send(writer, 'error move needs a game and a move')
+        elif game.turn == game.ai:
+            self._send(writer, 'error not your turn')
+        else:
+            try:
+                game.play(args[1])
+            except ValueError as error:
+                self._send(writer, f'error {error}')
+                return
+            self._send(writer, 'ok')
+            self._next(game)
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            game = await self.queue.get()
+            if game.closed:
+                continue
+            try:
+                name = await loop.run_in_executor(self.executor, _think, game.board.fen(game.turn), self.max_depth, self.time_limit)
+                if game.closed or name is None:
+                    continue
+                game.play(name)
+            except Exception as error:
+                # the game cannot go on, the server and its other games do
+                self._send(game.writer, f'error game {game.id} failed: {error!r}')
+                self._close(game)
+                continue
+            self._send(game.writer, f'move {game.id} {name}')
+            self._next(game)
+
+    def _next(self, game):
+        # after a move, or at the start: the game is over, or the AI may have to move
+        result = game.result()
+        if result is not None:
+            self._send(game.writer, f'result {game.id} {result}')
+        elif game.turn == game.ai:
+            self.queue.put_nowait(game)
+
+    def _close(self, game):
+        game.closed = True
+        self.games.pop(game.id, None)
+
+    def _send(self, writer, line):
+        if not writer.is_closing():
+            writer.write((line + '\n').encode())
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve many headless games over a local socket')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--workers', type=int, help='AI search processes, one per core by default')
+    parser.add_argument('--hash', type=int, default=AI_HASH_SIZE, help='transposition table size in MB of each worker')
+    parser.add_argument('--time', type=float, default=AI_TIME_LIMIT, help='seconds the AI thinks per move')
+    parser.add_argument('--depth', type=int, default=AI_MAX_DEPTH, help='deepest the AI searches')
+    args = parser.parse_args()
+
+    server = GameServer(args.workers, args.hash, args.depth, args.time)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
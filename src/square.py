@@ -3,15 +3,23 @@ class Square:
 
     ALPHACOLS = {0: 'a', 1: 'b', 2: 'c', 3: 'd', 4: 'e', 5: 'f', 6: 'g', 7: 'h'}
 
+    __slots__ = ('row', 'col', 'piece')
+
     def __init__(self, row, col, piece=None):
         self.row = row
         self.col = col
         self.piece = piece
-        self.alphacol = self.ALPHACOLS[col]
+
+    @property
+    def alphacol(self):
+        return self.ALPHACOLS[self.col]
 
     def __eq__(self, other):
         return self.row == other.row and self.col == other.col 
 
+    def __hash__(self):
+        return self.row * 8 + self.col
+
     def has_piece(self):
         return self.piece != None
     
@@ -37,6 +45,5 @@ class Square:
     
     @staticmethod
     def get_alphacol(col):
-        ALPHACOLS = {0: 'a', 1: 'b', 2: 'c', 3: 'd', 4: 'e', 5: 'f', 6: 'g', 7: 'h'}
-        return ALPHACOLS[col]
+        return Square.ALPHACOLS[col]
 
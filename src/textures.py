@@ -0,0 +1,33 @@
+import pygame
+
+from piece import texture_path
+
+# the sizes the piece images come in: on the board, and picked up
+SIZES = (80, 128)
+NAMES = ('pawn', 'knight', 'bishop', 'rook', 'queen', 'king')
+
+class Textures:
+    '''
+        Piece images, each decoded once per size and shared by every piece that
+        shows it. Surfaces are converted for the display, so load() has to come
+        after pygame.display.set_mode
+    '''
+
+    def __init__(self):
+        self.surfaces = {}
+
+    def load(self):
+        for size in SIZES:
+            for color in ('white', 'black'):
+                for name in NAMES:
+                    self.get(color, name, size)
+
+    def get(self, color, name, size=80):
+        key = (color, name, size)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = pygame.image.load(texture_path(color, name, size)).convert_alpha()
+            self.surfaces[key] = surface
+        return surface
+
+textures = Textures()
@@ -0,0 +1,67 @@
+import sys
+
+# bound types
+EXACT = 0
+LOWER = 1 # the score is at least this (beta cutoff)
+UPPER = 2 # the score is at most this (failed low)
+
+# replacement policies
+DEPTH_PREFERRED = 'depth'
+ALWAYS_REPLACE = 'always'
+
+# rough size of one stored entry: the entry tuple, its key and the best move
+ENTRY_SIZE = sys.getsizeof((0, 0, 0, 0, 0, 0)) + sys.getsizeof(1 << 63) + sys.getsizeof(1 << 15)
+
+class TranspositionTable:
+    '''
+        Fixed-size hash table of search results, indexed by Zobrist key. The number
+        of slots is derived from a memory cap in megabytes
+    '''
+
+    def __init__(self, size_mb=16, policy=DEPTH_PREFERRED):
+        self.size = max(1, size_mb * 1024 * 1024 // ENTRY_SIZE)
+        self.policy = policy
+        self.entries = [None] * self.size
+        self.age = 0
+        self.probes = 0
+        self.hits = 0
+
+    def new_search(self):
+        # entries from earlier searches may be replaced whatever their depth
+        self.age += 1
+        self.probes = 0
+        self.hits = 0
+
+    def clear(self):
+        self.entries = [None] * self.size
+        self.age = 0
+
+    def probe(self, key):
+        '''
+            Returns the (depth, bound, score, move) stored for the key, or None
+        '''
+        self.probes += 1
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1:5]
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        index = key % self.size
+        entry = self.entries[index]
+        if self.policy == DEPTH_PREFERRED and entry is not None:
+            # keep a deeper result of the current search for another position
+            if entry[5] == self.age and entry[0] != key and entry[1] > depth:
+                return
+            # keep the best move found for this position if the new result has none
+            if move is None and entry[0] == key:
+                move = entry[4]
+        self.entries[index] = (key, depth, bound, score, move, self.age)
+
+    def hashfull(self):
+        '''
+            Permille of the slots used by the current search, sampled from the first thousand
+        '''
+        sample = self.entries[:1000]
+        return sum(1 for entry in sample if entry is not None and entry[5] == self.age) * 1000 // len(sample)
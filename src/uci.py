@@ -0,0 +1,211 @@
+import os
+import sys
+import threading
+
+from const import AI_MAX_DEPTH, AI_HASH_SIZE
+from bitboard import *
+from board import Board, START_FEN
+from move import move_name, parse_move
+from search import MATE, MATE_BOUND
+from transposition import TranspositionTable
+from worker import SearchJob
+from parallel import SearchPool
+
+# UCI (Universal Chess Interface) front-end, so the engine can run under chess
+# GUIs and tournament managers: commands on stdin, replies on stdout.
+
+NAME = 'AI Chess Duel'
+MAX_HASH = 1024
+MAX_THREADS = os.cpu_count() or 1
+
+# share of the remaining clock spent on a move when the GUI sends no movestogo
+MOVES_TO_GO = 30
+
+def score_name(score):
+    if score >= MATE_BOUND:
+        return f'mate {(MATE - score + 1) // 2}'
+    if score <= -MATE_BOUND:
+        return f'mate -{(MATE + score) // 2}'
+    return f'cp {score}'
+
+class UCI:
+
+    def __init__(self, output=sys.stdout):
+        self.output = output
+        self.lock = threading.Lock()
+        self.board = Board()
+        self.turn = 'white'
+        self.hash_size = AI_HASH_SIZE
+        self.tt = TranspositionTable(self.hash_size)
+        # worker processes, with more than one thread
+        self.pool = None
+        self.job = None
+        # go infinite: a search that ends by itself keeps its bestmove until stop
+        self.infinite = False
+        self.held = None
+
+    def send(self, line):
+        # replies come from the search thread too
+        with self.lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def run(self, input=sys.stdin):
+        for line in input:
+            if not self.command(line.split()):
+                break
+        self.stop()
+        if self.pool is not None:
+            self.pool.close()
+
+    def command(self, words):
+        '''
+            Carries out one command. Returns False on quit
+        '''
+        if not words:
+            return True
+        name, args = words[0], words[1:]
+        if name == 'uci':
+            self.send(f'id name {NAME}')
+            self.send(f'option name Hash type spin default {AI_HASH_SIZE} min 1 max {MAX_HASH}')
+            self.send(f'option name Threads type spin default 1 min 1 max {MAX_THREADS}')
+            self.send('uciok')
+        elif name == 'isready':
+            self.send('readyok')
+        elif name == 'setoption':
+            self.stop()
+            self.set_option(args)
+        elif name == 'ucinewgame':
+            self.stop()
+            self.tt.clear()
+        elif name == 'position':
+            self.stop()
+            self.position(args)
+        elif name == 'go':
+            self.stop()
+            self.go(args)
+        elif name == 'stop':
+            self.stop()
+        elif name == 'quit':
+            return False
+        # anything else is ignored, as the protocol asks
+        return True
+
+    def set_option(self, args):
+        # setoption name <name> value <value>
+        if 'value' not in args or args[:1] != ['name']:
+            return
+        index = args.index('value')
+        name, value = ' '.join(args[1:index]).lower(), ' '.join(args[index + 1:])
+        try:
+            if name == 'hash':
+                self.hash_size = max(1, min(int(value), MAX_HASH))
+                self.tt = TranspositionTable(self.hash_size)
+                self._restart_pool(self.pool.workers if self.pool else 1)
+            elif name == 'threads':
+                self._restart_pool(max(1, min(int(value), MAX_THREADS)))
+        except ValueError:
+            self.send(f'info string bad value for {name}: {value}')
+
+    def _restart_pool(self, threads):
+        if self.pool is not None:
+            self.pool.close()
+        self.pool = SearchPool(threads, self.hash_size) if threads > 1 else None
+
+    def position(self, args):
+        # position startpos|fen <fen> [moves <move> ...]
+        moves = args.index('moves') if 'moves' in args else len(args)
+        if args[:1] == ['startpos']:
+            fen = START_FEN
+        elif args[:1] == ['fen']:
+            fen = ' '.join(args[1:moves])
+        else:
+            return
+        # a new board each time, nothing of an earlier position can carry over
+        self.board = Board()
+        try:
+            self.turn = self.board.set_fen(fen)
+        except ValueError:
+            self.send(f'info string bad fen: {fen}')
+            self.turn = self.board.set_fen(START_FEN)
+            return
+        for name in args[moves + 1:]:
+            try:
+                move = parse_move(name)
+            except ValueError:
+                move = None
+            if move not in self.board.generate_moves(COLOR_INDEX[self.turn]):
+                self.send(f'info string illegal move: {name}')
+                return
+            self.board.make_move(move)
+            self.turn = 'black' if self.turn == 'white' else 'white'
+
+    def go(self, args):
+        params = {}
+        for key, value in zip(args, args[1:]):
+            if key in ('depth', 'movetime', 'wtime', 'btime', 'winc', 'binc', 'movestogo', 'nodes') and value.isdigit():
+                params[key] = int(value)
+
+        time_limit = None
+        if 'movetime' in params:
+            time_limit = params['movetime'] / 1000
+        elif 'infinite' not in args:
+            remaining = params.get('wtime' if self.turn == 'white' else 'btime')
+            increment = params.get('winc' if self.turn == 'white' else 'binc', 0)
+            if remaining is not None:
+                # never more than half of what is left on the clock
+                time_limit = min(remaining / params.get('movestogo', MOVES_TO_GO) + increment * 0.8, remaining / 2) / 1000
+
+        self.infinite = 'infinite' in args
+        limits = dict(max_depth=params.get('depth', AI_MAX_DEPTH), time_limit=time_limit, node_limit=params.get('nodes'))
+        if self.pool is not None:
+            self.job = SearchJob(self.board, self.turn, pool=self.pool, on_done=self._bestmove, **limits)
+        else:
+            self.job = SearchJob(self.board, self.turn, on_done=self._bestmove, tt=self.tt, info=self._info, **limits)
+
+    def stop(self):
+        # the search ends with its best move so far, which it still reports
+        job = self.job
+        if job is not None:
+            with self.lock:
+                self.infinite = False
+                held, self.held = self.held, None
+            job.search.stop()
+            job.wait()
+            if held is not None:
+                self._send_bestmove(held)
+            self.job = None
+
+    def _info(self, result):
+        elapsed = max(result.elapsed, 0.001)
+        self.send(f'info depth {result.depth} score {score_name(result.score)} nodes {result.nodes} '
+                  f'nps {int(result.nodes / elapsed)} time {int(elapsed * 1000)} hashfull {self.tt.hashfull()} '
+                  f'pv ' + ' '.join(self._pv_names(result.pv)))
+
+    def _pv_names(self, pv):
+        # each move is encoded on the board it is played from, the line can end in a
+        # move from the transposition table that no longer fits
+        board, c = self.board.copy(), COLOR_INDEX[self.turn]
+        names = []
+        for move in pv:
+            move = board.encode(move)
+            if not board.is_pseudo_legal(move, c):
+                break
+            names.append(move_name(move))
+            board.make_move(move)
+            c ^= 1
+        return names
+
+    def _bestmove(self, job):
+        with self.lock:
+            if self.infinite:
+                self.held = job
+                return
+        self._send_bestmove(job)
+
+    def _send_bestmove(self, job):
+        result = job.result
+        self.send(f'bestmove {move_name(self.board.encode(result.move))}' if result else 'bestmove 0000')
+
+if __name__ == '__main__':
+    UCI().run()
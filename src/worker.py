@@ -0,0 +1,50 @@
+import threading
+
+from search import Search
+from parallel import ParallelSearch
+
+class SearchJob:
+    '''
+        A search running in a background thread, so the caller can keep handling
+        events and drawing. It searches a copy of the board, the caller's board
+        may change while it runs. Poll done() and read result, or cancel() it.
+        With a SearchPool the search is spread over its worker processes.
+        on_done is called with the job, from the search thread, when it finishes
+    '''
+
+    def __init__(self, board, player_color, pool=None, on_done=None, **limits):
+        # limits are passed on to Search or ParallelSearch: max_depth, time_limit, node_limit (and tt, info for Search)
+        self.player_color = player_color
+        # hash of the position searched, to tell if the result still fits the caller's board
+        self.key = board.hash
+        if pool is not None:
+            self.search = ParallelSearch(board.copy(), pool, **limits)
+        else:
+            self.search = Search(board.copy(), **limits)
+        self.result = None
+        self.cancelled = False
+        self.on_done = on_done
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        result = self.search.search(self.player_color)
+        if not self.cancelled:
+            self.result = result
+        if self.on_done is not None:
+            self.on_done(self)
+
+    def done(self):
+        return not self._thread.is_alive()
+
+    def cancel(self):
+        '''
+            Stop the search and drop its result. Returns at once, the thread
+            finishes within the next thousand nodes or so
+        '''
+        self.cancelled = True
+        self.search.stop()
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return self.result
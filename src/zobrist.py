@@ -0,0 +1,17 @@
+import random
+
+# Zobrist keys: one random 64-bit number per piece on each square, per set of
+# castling rights, per en passant square and for black to move. A position's
+# key is the xor of the keys of everything in it, so a move only has to xor
+# out what it removes and xor in what it adds.
+
+_random = random.Random(2024)
+
+def _key():
+    return _random.getrandbits(64)
+
+# indexed by color index, piece kind and square
+PIECE_KEYS = [[[_key() for _ in range(64)] for _ in range(6)] for _ in range(2)]
+CASTLING_KEYS = [_key() for _ in range(16)]
+EN_PASSANT_KEYS = [_key() for _ in range(64)]
+SIDE_KEY = _key()